@@ -0,0 +1,65 @@
+"""Compare the wavefront error diffusion engine with the per-pixel reference.
+
+"identical" checks the engine against the reference loop; "baseline" checks
+the engine with legacy=True against the loop as it was before the diffusion
+fix, i.e. the output of the original methods.
+
+Usage: python benchmarks/bench_error_diffusion.py [--size 640x480] [--palette 1bit_gray]
+                                                   [--skip-reference]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import error_diffusion
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', default='640x480', help='image size as WIDTHxHEIGHT')
+    parser.add_argument('--palette', default='1bit_gray')
+    parser.add_argument('--threshold', type=float, default=0.5)
+    parser.add_argument('--methods', nargs='*', default=error_diffusion._method_names_fast)
+    parser.add_argument('--skip-reference', action='store_true',
+                        help='compare against the serial engine instead of the slow reference')
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    image = np.random.default_rng(0).random((height, width, 3), dtype=np.float32)
+
+    print(f"{width}x{height}, palette {args.palette}")
+    print(f"{'method':<16}{'reference s':>12}{'engine s':>12}{'speedup':>10}  identical  baseline")
+
+    for name in args.methods:
+        matrix = error_diffusion._diffusion_matrices_fast[name]
+        result, engine_time = _timed(error_diffusion._error_diffusion,
+                                     image, args.palette, matrix, args.threshold)
+        if args.skip_reference:
+            expected, ref_time = result, float('nan')
+        else:
+            expected, ref_time = _timed(error_diffusion._error_diffusion_reference,
+                                        image, args.palette, matrix, args.threshold)
+        identical = np.array_equal(expected, result)
+        if args.skip_reference:
+            baseline = '-'
+        else:
+            baseline = np.array_equal(
+                error_diffusion._error_diffusion_reference(image, args.palette, matrix, args.threshold, legacy=True),
+                error_diffusion._error_diffusion(image, args.palette, matrix, args.threshold, legacy=True))
+        print(f"{name:<16}{ref_time:>12.3f}{engine_time:>12.3f}{ref_time / engine_time:>9.1f}x"
+              f"  {str(identical):<9}  {baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Peak memory and time of the palette lookups the dither methods go through.
+
+Every size is an ordered (bayer4x4) frame of random pixels, quantized three
+ways: the tiled exact search of closest_palette_color, the LUT on float
+pixels (utils.quantize) and the LUT on uint8 pixels through the value table
+(utils.table_palette_indices). The last two must match the first.
+
+Usage: python benchmarks/bench_palette_lookup.py [--sizes 640x480 1920x1080]
+                                                 [--palettes 1bit_gray websafe] [--limit-mb 32]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import ordered_dithering
+import utils
+
+
+def _measure(func, *args, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='*', default=['640x480', '1920x1080', '3840x2160'])
+    parser.add_argument('--palettes', nargs='*', default=['1bit_gray', 'c64', 'websafe'])
+    parser.add_argument('--limit-mb', type=float, default=utils.TILE_MEMORY_LIMIT / 2 ** 20,
+                        help='ceiling for the search tiles and lookup blocks')
+    args = parser.parse_args()
+
+    utils.TILE_MEMORY_LIMIT = int(args.limit_mb * 2 ** 20)
+    map_to_use = ordered_dithering._diffusion_matrices['bayer4x4']
+    bounds = ordered_dithering.NOISY_BOUNDS
+    rng = np.random.default_rng(0)
+
+    print(f"limit {args.limit_mb:.0f} MB, peak is traced NumPy memory above the input, "
+          f"output included")
+    print(f"{'size':<12}{'palette':<12}{'exact s':>9}{'peak MB':>9}{'float s':>9}{'peak MB':>9}"
+          f"{'uint8 s':>9}{'peak MB':>9}  identical")
+    for size in args.sizes:
+        width, height = (int(v) for v in size.lower().split('x'))
+        pixels = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        noisy = utils.uint8_to_float(pixels) + ordered_dithering._threshold_plane(map_to_use, height, width, 0.5)
+        for palette_name in args.palettes:
+            palette_array = utils._palette_cache.get_palette_array(palette_name)
+            # Build the LUT, the index and the cached map offsets outside the measurements
+            utils._palette_cache.get_lut(palette_name, bounds=bounds)
+            utils._palette_cache.get_palette_index(palette_name, bounds)
+            ordered_dithering._map_offsets(map_to_use.shape[0], height, width)
+
+            exact, exact_time, exact_peak = _measure(utils.closest_palette_color, noisy, palette_name)
+            lut, lut_time, lut_peak = _measure(utils.quantize, noisy, palette_name, bounds=bounds)
+            table, table_time, table_peak = _measure(ordered_dithering._ordered_indices_uint8,
+                                                     pixels, palette_name, map_to_use)
+            identical = np.array_equal(exact, lut) and np.array_equal(exact, palette_array[table])
+            print(f"{size:<12}{palette_name:<12}{exact_time:>9.3f}{exact_peak:>9.1f}{lut_time:>9.3f}"
+                  f"{lut_peak:>9.1f}{table_time:>9.3f}{table_peak:>9.1f}  {identical}")
+
+
+if __name__ == '__main__':
+    main()
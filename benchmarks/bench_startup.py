@@ -0,0 +1,74 @@
+"""Measure cold start: how long fresh interpreters take to get going, and what they load.
+
+Every case runs --repeat times in a new Python process; the median wall
+time, including interpreter startup, is reported with the heavy modules
+the case ended up importing. The export worker case starts the way a
+spawned export process does, by importing main.py as __mp_main__.
+
+Usage: python benchmarks/bench_startup.py [--repeat 5] [--cases cli methods gui worker]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# Modules worth knowing about when they load
+HEAVY_MODULES = ['numpy', 'PIL.Image', 'cv2', 'PyQt6.QtWidgets',
+                 'threshold', 'randomized', 'ordered_dithering', 'error_diffusion']
+
+CASES = OrderedDict([
+    ('python', 'pass'),
+    ('cli', 'import cli; cli.build_parser()'),
+    ('methods', 'import methods'),
+    ('first_dither', 'from PIL import Image; import methods; '
+                     'methods.dither_image(Image.new("RGB", (64, 48)), 100, 0.5, "bayer4x4", "1bit_gray")'),
+    ('gui', 'import gui'),
+    ('gui_window', 'import gui; app = gui.QApplication([]); window = gui.MainWindow(); '
+                   'app.processEvents(); window._cleanup_resources()'),
+    ('worker', 'import runpy; runpy.run_path("main.py", run_name="__mp_main__"); '
+               'import batch_export, numpy; '
+               'batch_export._dither_frame(numpy.zeros((48, 64, 3), numpy.uint8), 100, 0.5, "bayer4x4", "1bit_gray")'),
+])
+
+REPORT = '; import json, sys; print(json.dumps([m for m in {} if m in sys.modules]))'
+
+
+def measure(code, repeat):
+    """Median seconds of repeat fresh runs of code, and the heavy modules it loaded."""
+    command = [sys.executable, '-c', code + REPORT.format(HEAVY_MODULES)]
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = subprocess.run(command, cwd=SRC, env=env, capture_output=True, text=True)
+        times.append(time.perf_counter() - start)
+        if completed.returncode != 0:
+            lines = completed.stderr.strip().splitlines()
+            return None, lines[-1] if lines else f"exit status {completed.returncode}"
+    times.sort()
+    return times[len(times) // 2], json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='runs per case, the median counts')
+    parser.add_argument('--cases', nargs='*', default=list(CASES), choices=list(CASES))
+    args = parser.parse_args()
+
+    print(f"{'case':<14}{'ms':>8}  loaded")
+    for name in args.cases:
+        seconds, loaded = measure(CASES[name], args.repeat)
+        if seconds is None:
+            print(f"{name:<14}  error: {loaded}")
+        else:
+            print(f"{name:<14}{seconds * 1e3:>8.0f}  {', '.join(loaded) or '-'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,329 @@
+"""Time every dithering method on every palette at several sizes and on video.
+
+Each case runs in its own process, so the peak RSS belongs to that case
+alone. For video cases it is the peak of the case process plus the peak of
+every export worker, sampled while the export runs (Linux only), so it
+is the footprint of the whole pool; the largest single process is kept
+as process_peak_rss_mb. Results are written as JSON; with --baseline they are compared to
+an earlier run and cases that got slower or bigger than --tolerance are
+flagged (exit status 1).
+
+Usage: python benchmarks/bench_suite.py [--methods bayer4x4 atkinson] [--palettes 1bit_gray c64]
+                                        [--sizes vga 1080p 4k] [--video-frames 60] [--no-video]
+                                        [--output results.json] [--baseline baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+SIZES = OrderedDict([
+    ('vga', (640, 480)),
+    ('1080p', (1920, 1080)),
+    ('4k', (3840, 2160)),
+])
+
+
+def _parse_size(size):
+    if size in SIZES:
+        return SIZES[size]
+    width, height = (int(v) for v in size.lower().split('x'))
+    return width, height
+
+
+def _synthetic_frame(width, height, frame_index=0):
+    """Gradients with mild noise and a moving square; deterministic per frame."""
+    y = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, np.newaxis]
+    x = np.linspace(0.0, 1.0, width, dtype=np.float32)[np.newaxis, :]
+    frame = np.stack([np.broadcast_to(x, (height, width)),
+                      np.broadcast_to(y, (height, width)),
+                      (x + y) / 2], axis=-1)
+    frame = frame + np.random.default_rng(frame_index).normal(0.0, 0.03, frame.shape)
+    side = max(1, min(width, height) // 4)
+    left = (frame_index * 8) % max(1, width - side)
+    frame[height // 3:height // 3 + side, left:left + side] = (1.0, 0.8, 0.2)
+    return (np.clip(frame, 0.0, 1.0) * 255).astype(np.uint8)
+
+
+def _peak_rss_mb():
+    """Largest resident size of this process or any finished child, None where unknown."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10)
+
+
+def _own_peak_rss_mb():
+    """Peak resident size of this process alone, None where unknown."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10)
+
+
+class _ChildPeaks:
+    """Samples the peak RSS (VmHWM) of every child process while it lives.
+
+    RUSAGE_CHILDREN only reports the largest child, so a pool's combined
+    footprint needs each worker's own peak. Reads /proc; elsewhere
+    total_mb() is None.
+    """
+    INTERVAL = 0.05
+
+    def __init__(self):
+        self.peaks_kb = {}
+        self.available = os.path.isdir('/proc/self')
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        if self.available:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.available:
+            self._stop.set()
+            self._thread.join()
+        return False
+
+    def _children(self):
+        parent = str(os.getpid())
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # The command name may hold spaces, the fields after it do not
+                    if f.read().rsplit(')', 1)[1].split()[1] == parent:
+                        yield entry
+            except (OSError, IndexError):
+                continue
+
+    def sample(self):
+        for pid in self._children():
+            try:
+                with open(f'/proc/{pid}/status') as f:
+                    for line in f:
+                        if line.startswith('VmHWM:'):
+                            peak = int(line.split()[1])
+                            self.peaks_kb[pid] = max(self.peaks_kb.get(pid, 0), peak)
+                            break
+            except OSError:
+                continue
+
+    def _run(self):
+        while not self._stop.wait(self.INTERVAL):
+            self.sample()
+
+    def total_mb(self):
+        return sum(self.peaks_kb.values()) / 2 ** 10 if self.available else None
+
+
+def _run_image_case(case):
+    from PIL import Image
+    from methods import dither_image
+
+    width, height = case['size']
+    image = Image.fromarray(_synthetic_frame(width, height))
+    # Palette tables and indexes are built once per process, not per frame
+    dither_image(image.resize((64, 48)), 100, case['threshold'], case['method'], case['palette'])
+
+    times = []
+    for _ in range(case['repeat']):
+        start = time.perf_counter()
+        dither_image(image, 100, case['threshold'], case['method'], case['palette'])
+        times.append(time.perf_counter() - start)
+    return {'seconds': float(np.median(times)), 'megapixels': width * height / 1e6}
+
+
+class _NullWriter:
+    def write(self, frame_index, frame):
+        pass
+
+    def close(self):
+        pass
+
+
+def _run_video_case(case):
+    import cv2
+    from batch_export import BatchExporter
+
+    width, height = case['size']
+    frames = case['frames']
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'synthetic.avi')
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'png '), 25.0, (width, height))
+        for frame_index in range(frames):
+            writer.write(cv2.cvtColor(_synthetic_frame(width, height, frame_index), cv2.COLOR_RGB2BGR))
+        writer.release()
+
+        exporter = BatchExporter(path, _NullWriter(), 100, case['threshold'], case['method'],
+                                 case['palette'], workers=case['workers'])
+        with _ChildPeaks() as children:
+            start = time.perf_counter()
+            written = exporter.run()
+            seconds = time.perf_counter() - start
+    result = {'seconds': seconds, 'megapixels': written * width * height / 1e6, 'frames': written}
+    own_peak = _own_peak_rss_mb()
+    if children.total_mb() is not None and own_peak is not None:
+        result['peak_rss_mb'] = own_peak + children.total_mb()
+    return result
+
+
+def run_case(case):
+    """Measure one case in the current process."""
+    if case['kind'] == 'video':
+        result = _run_video_case(case)
+    else:
+        result = _run_image_case(case)
+    result['mp_per_s'] = result['megapixels'] / max(result['seconds'], 1e-9)
+    result['process_peak_rss_mb'] = _peak_rss_mb()
+    # Image cases run in this process alone
+    result.setdefault('peak_rss_mb', result['process_peak_rss_mb'])
+    return result
+
+
+def _case_id(case):
+    width, height = case['size']
+    return f"{case['kind']}/{case['method']}/{case['palette']}/{width}x{height}"
+
+
+def _measure_in_subprocess(case, timeout):
+    command = [sys.executable, os.path.abspath(__file__), '--run-case', json.dumps(case)]
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {'error': f"timed out after {timeout}s"}
+    if completed.returncode != 0:
+        lines = completed.stderr.strip().splitlines()
+        return {'error': lines[-1] if lines else f"exit status {completed.returncode}"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def build_cases(args):
+    import methods
+    import palette
+
+    method_names = args.methods or list(methods.available_methods)
+    palette_names = args.palettes or list(palette.available_palettes)
+    cases = []
+    if not args.no_images:
+        for size in args.sizes:
+            for method in method_names:
+                for palette_name in palette_names:
+                    cases.append({'kind': 'image', 'method': method, 'palette': palette_name,
+                                  'size': _parse_size(size), 'threshold': args.threshold,
+                                  'repeat': args.repeat})
+    if not args.no_video:
+        for method in method_names:
+            for palette_name in args.video_palettes:
+                cases.append({'kind': 'video', 'method': method, 'palette': palette_name,
+                              'size': _parse_size(args.video_size), 'threshold': args.threshold,
+                              'frames': args.video_frames, 'workers': args.workers})
+    return cases
+
+
+def compare(results, baseline, tolerance):
+    """Lines describing cases slower or bigger than baseline by more than tolerance."""
+    previous = {entry['case']: entry for entry in baseline.get('results', [])}
+    regressions = []
+    for entry in results:
+        old = previous.get(entry['case'])
+        if old is None or 'error' in entry or 'error' in old:
+            continue
+        ratio = entry['seconds'] / max(old['seconds'], 1e-9)
+        if ratio > 1.0 + tolerance:
+            regressions.append(f"{entry['case']}: {old['seconds']:.3f}s -> {entry['seconds']:.3f}s "
+                               f"({ratio:.2f}x time)")
+        if entry.get('peak_rss_mb') and old.get('peak_rss_mb'):
+            ratio = entry['peak_rss_mb'] / old['peak_rss_mb']
+            if ratio > 1.0 + tolerance:
+                regressions.append(f"{entry['case']}: {old['peak_rss_mb']:.0f} MB -> "
+                                   f"{entry['peak_rss_mb']:.0f} MB ({ratio:.2f}x peak RSS)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--methods', nargs='*', default=None, help='default: every method')
+    parser.add_argument('--palettes', nargs='*', default=None, help='default: every palette')
+    parser.add_argument('--sizes', nargs='*', default=list(SIZES),
+                        help='vga, 1080p, 4k or WIDTHxHEIGHT')
+    parser.add_argument('--threshold', type=float, default=0.5)
+    parser.add_argument('--repeat', type=int, default=3, help='image runs per case, the median counts')
+    parser.add_argument('--no-images', action='store_true')
+    parser.add_argument('--no-video', action='store_true')
+    parser.add_argument('--video-size', default='vga')
+    parser.add_argument('--video-frames', type=int, default=60)
+    parser.add_argument('--video-palettes', nargs='*', default=['1bit_gray', 'c64'])
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='export processes for video cases (default: all cores)')
+    parser.add_argument('--timeout', type=float, default=None, help='seconds per case')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=None, help='earlier --output to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='flag cases more than this fraction slower or bigger (default 0.25)')
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(json.loads(args.run_case))))
+        return 0
+
+    cases = build_cases(args)
+    results = []
+    print(f"{'case':<48}{'seconds':>10}{'MP/s':>10}{'peak MB':>10}")
+    for case in cases:
+        entry = {'case': _case_id(case)}
+        entry.update(case)
+        entry.update(_measure_in_subprocess(case, args.timeout))
+        results.append(entry)
+        if 'error' in entry:
+            print(f"{entry['case']:<48}  error: {entry['error']}")
+        else:
+            peak = f"{entry['peak_rss_mb']:.0f}" if entry['peak_rss_mb'] is not None else '-'
+            print(f"{entry['case']:<48}{entry['seconds']:>10.3f}{entry['mp_per_s']:>10.2f}{peak:>10}")
+
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} cases to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        print(f"{len(regressions)} regressions against {args.baseline}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
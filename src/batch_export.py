@@ -0,0 +1,445 @@
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+def _dither_frame(frame_rgb, scale_percent, threshold_value, dither_method, palette_method):
+    """Worker process entry point: dither one RGB frame and return it as uint8."""
+    from methods import dither_image
+
+    result = dither_image(Image.fromarray(frame_rgb), scale_percent, threshold_value,
+                          dither_method, palette_method)
+    return np.asarray(result)
+
+def _dither_batch(frames_rgb, scale_percent, threshold_value, dither_method, palette_method):
+    """Worker process entry point: dither a list of RGB frames, returned as uint8.
+
+    Methods with a uint8 path dither the whole batch in one pass.
+    """
+    import utils
+    from methods import batch_indices, prepare_pixels, uint8_methods
+
+    if dither_method not in uint8_methods:
+        return [_dither_frame(frame_rgb, scale_percent, threshold_value, dither_method, palette_method)
+                for frame_rgb in frames_rgb]
+    resized = np.stack([prepare_pixels(Image.fromarray(frame_rgb), scale_percent) for frame_rgb in frames_rgb])
+    colors = utils.palette_colors_uint8(palette_method)
+    return list(colors[batch_indices(resized, threshold_value, dither_method, palette_method)])
+
+def _dither_regions(regions, threshold_value, dither_method, palette_method, seed):
+    """Worker entry point for temporal export: dither uint8 crops of resized frames, returned as uint8."""
+    import utils
+    from methods import dither_matrix
+
+    return [np.asarray(utils.numpy2pil(dither_matrix(region, threshold_value, dither_method, palette_method, seed)))
+            for region in regions]
+
+class ImageSequenceWriter:
+    """Writes every frame as result_<n>.<format> into a directory."""
+    def __init__(self, results_dir, file_format='jpg'):
+        self.results_dir = results_dir
+        self.file_format = file_format
+        os.makedirs(results_dir, exist_ok=True)
+
+    def write(self, frame_index, frame):
+        filename = os.path.join(self.results_dir, f"result_{frame_index + 1}.{self.file_format}")
+        Image.fromarray(frame).save(filename)
+
+    def close(self):
+        pass
+
+class VideoFileWriter:
+    """Streams frames into a lossless video through cv2.VideoWriter.
+
+    The writer opens on the first frame, once the dithered size is known.
+    """
+    # Lossless codecs; PNG frames keep few-color output small
+    CODECS = {
+        '.mkv': 'FFV1',
+        '.avi': 'png ',
+        '.mov': 'png ',
+    }
+
+    def __init__(self, path, fps):
+        self.path = path
+        self.fps = fps if fps and fps > 0 else 25.0
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in self.CODECS:
+            raise ValueError(f"Unsupported video container: {extension}")
+        self.fourcc = self.CODECS[extension]
+        self._writer = None
+
+    def write(self, frame_index, frame):
+        import cv2
+
+        if self._writer is None:
+            height, width = frame.shape[:2]
+            self._writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc),
+                                           self.fps, (width, height))
+            if not self._writer.isOpened():
+                raise RuntimeError(f"Could not open video writer for {self.path}")
+        self._writer.write(cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+def _frame_duration(fps):
+    """Milliseconds per frame for animations, 40 when fps is unknown."""
+    return int(round(1000.0 / fps)) if fps and fps > 0 else 40
+
+class GifWriter:
+    """Streams an animated GIF to disk one frame at a time.
+
+    Every frame carries its own color table, so memory stays flat however
+    long the clip is. A frame with more than 256 colors is reduced to 256,
+    as GIF cannot hold more.
+    """
+    def __init__(self, path, fps):
+        self.path = path
+        self.duration = _frame_duration(fps)
+        self._file = None
+
+    def _palette_image(self, frame):
+        packed = (frame[:, :, 0].astype(np.uint32) << 16) | (frame[:, :, 1].astype(np.uint32) << 8) | frame[:, :, 2]
+        colors, inverse = np.unique(packed, return_inverse=True)
+        if len(colors) > 256:
+            return Image.fromarray(frame).convert('P', palette=Image.Palette.ADAPTIVE)
+        table = np.stack([(colors >> 16) & 0xFF, (colors >> 8) & 0xFF, colors & 0xFF], axis=1)
+        image = Image.fromarray(inverse.reshape(packed.shape).astype(np.uint8), mode='P')
+        image.putpalette(table.astype(np.uint8).ravel().tolist())
+        return image
+
+    def write(self, frame_index, frame):
+        from PIL import GifImagePlugin
+
+        image = self._palette_image(frame)
+        if self._file is None:
+            self._file = open(self.path, 'wb')
+            header, _ = GifImagePlugin.getheader(image, info={'loop': 0, 'duration': self.duration})
+            for chunk in header:
+                self._file.write(chunk)
+        for chunk in GifImagePlugin.getdata(image, duration=self.duration, include_color_table=True):
+            self._file.write(chunk)
+
+    def close(self):
+        if self._file is not None:
+            self._file.write(b';')  # trailer
+            self._file.close()
+            self._file = None
+
+class AnimationWriter:
+    """Writes an animated PNG when closed.
+
+    Pillow needs every frame at save time, so frames are kept as 8-bit
+    palette images, a third of the RGB size. All frames share one color
+    table, as APNG stores a single palette, so an index means the same
+    color in every frame. Past 256 colors the frames are kept as RGB.
+    Past MAX_BUFFERED_MB of frames the export fails; long clips belong in
+    a video container such as .mkv.
+    """
+    MAX_BUFFERED_MB = 512
+
+    def __init__(self, path, fps):
+        self.path = path
+        self.duration = _frame_duration(fps)
+        self._frames = []
+        self._buffered = 0
+        # Packed 0xRRGGBB -> index, in order of first use
+        self._color_index = {}
+        self._shared_palette = True
+
+    def _palette(self):
+        colors = np.array(list(self._color_index), dtype=np.uint32)
+        table = np.stack([(colors >> 16) & 0xFF, (colors >> 8) & 0xFF, colors & 0xFF], axis=1)
+        return table.astype(np.uint8).ravel().tolist()
+
+    def _to_palette_image(self, frame):
+        """Frame as a 'P' image on the shared table, None if it would overflow."""
+        packed = (frame[:, :, 0].astype(np.uint32) << 16) | (frame[:, :, 1].astype(np.uint32) << 8) | frame[:, :, 2]
+        colors, inverse = np.unique(packed, return_inverse=True)
+        colors = colors.tolist()
+        new_colors = [color for color in colors if color not in self._color_index]
+        if len(self._color_index) + len(new_colors) > 256:
+            return None
+        for color in new_colors:
+            self._color_index[color] = len(self._color_index)
+
+        lookup = np.array([self._color_index[color] for color in colors], dtype=np.uint8)
+        return Image.fromarray(lookup[inverse].reshape(packed.shape), mode='P')
+
+    def write(self, frame_index, frame):
+        image = self._to_palette_image(frame) if self._shared_palette else None
+        if image is None:
+            if self._shared_palette:
+                # Too many colors for one table, keep everything as RGB
+                table = self._palette()
+                for previous in self._frames:
+                    previous.putpalette(table)
+                self._frames = [previous.convert('RGB') for previous in self._frames]
+                self._buffered *= 3
+                self._shared_palette = False
+            image = Image.fromarray(frame)
+        self._frames.append(image)
+        self._buffered += image.width * image.height * len(image.getbands())
+        if self._buffered > self.MAX_BUFFERED_MB * 2 ** 20:
+            # Nothing is written for an animation that was cut short
+            self._frames = []
+            raise RuntimeError(f"Animated PNG export holds every frame in memory and passed "
+                               f"{self.MAX_BUFFERED_MB} MB; export long clips as .mkv or .gif")
+
+    def close(self):
+        if not self._frames:
+            return
+        if self._shared_palette:
+            table = self._palette()
+            for image in self._frames:
+                image.putpalette(table)
+        first, rest = self._frames[0], self._frames[1:]
+        first.save(self.path, save_all=True, append_images=rest, duration=self.duration, loop=0)
+        self._frames = []
+
+def make_writer(path, fps):
+    """Writer for an output file, chosen by extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.gif':
+        return GifWriter(path, fps)
+    if extension in ('.png', '.apng'):
+        return AnimationWriter(path, fps)
+    return VideoFileWriter(path, fps)
+
+def probe_video(video_path):
+    """Frame count and FPS of a video, (0, 0.0) if it cannot be opened."""
+    from video import VideoReader
+
+    reader = VideoReader(video_path)
+    try:
+        return reader.frame_count, reader.fps
+    finally:
+        reader.close()
+
+class BatchExporter:
+    """Dithers every frame of a video in a process pool.
+
+    Frames are decoded once, in order, by a FrameStream, and at most
+    max_in_flight tasks wait in the pool at any time. For methods with a
+    uint8 path a task is a batch of up to BATCH_PIXELS source pixels, so
+    small frames share the per-task overhead and the method's tables.
+    Results are handed to the writer in frame order. With temporal=True a TemporalDitherer
+    keeps the previous output for pixels that did not change; frames are
+    resized and compared on the calling thread and only the regions that
+    hold changes go to the workers. With incremental=True frames are
+    dithered in order on the calling thread by an IncrementalDitherer,
+    which only redoes what changed since the frame before. In both modes
+    skipped_fraction is the average share of each frame not dithered again.
+    progress_callback(done, total) is called from the thread that runs run().
+    """
+    BATCH_PIXELS = 2 * 1024 * 1024
+    MAX_BATCH_FRAMES = 16
+
+    def __init__(self, video_path, writer, scale_percent, threshold_value, dither_method,
+                 palette_method, workers=None, max_in_flight=None, progress_callback=None,
+                 temporal=False, incremental=False):
+        self.video_path = video_path
+        self.writer = writer
+        self.settings = (scale_percent, threshold_value, dither_method, palette_method)
+        self.temporal = temporal
+        self.incremental = incremental
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or 2 * self.workers
+        self.progress_callback = progress_callback
+        self.skipped_fraction = 0.0
+        self._decoded = 0
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def _batched(self):
+        from methods import uint8_methods
+
+        return self.settings[2] in uint8_methods
+
+    def _next_batch(self, frames, max_frames):
+        """Up to max_frames (frame_index, frame) pairs, fewer once BATCH_PIXELS is reached."""
+        batch = []
+        pixels = 0
+        while len(batch) < max_frames and pixels < self.BATCH_PIXELS:
+            item = next(frames, None)
+            if item is None:
+                break
+            batch.append(item)
+            pixels += item[1].shape[0] * item[1].shape[1]
+        return batch
+
+    def _frame_tasks(self, frames):
+        """(frame indices, task, arguments) of every pool task of a plain export."""
+        batch_frames = self.MAX_BATCH_FRAMES if self._batched() else 1
+        while True:
+            batch = self._next_batch(frames, batch_frames)
+            if not batch:
+                return
+            self._decoded += len(batch)
+            indices = [frame_index for frame_index, _ in batch]
+            yield indices, _dither_batch, ([frame for _, frame in batch],) + self.settings
+
+    def _temporal_tasks(self, frames, ditherer):
+        """(frame plans, task, arguments) of every pool task of a temporal export.
+
+        Change masks depend only on the input, so they are taken here in
+        frame order and just the boxes holding changes are sent to the pool;
+        a batch without any change needs no task.
+        """
+        from methods import prepare_pixels
+
+        scale_percent, threshold_value, dither_method, palette_method = self.settings
+        batch_frames = self.MAX_BATCH_FRAMES if self._batched() else 1
+        skipped = 0.0
+        while True:
+            batch = self._next_batch(frames, batch_frames)
+            if not batch:
+                return
+            plans = []
+            regions = []
+            for frame_index, frame_rgb in batch:
+                resized = prepare_pixels(Image.fromarray(frame_rgb), scale_percent)
+                changed = ditherer.update(resized)
+                boxes = ditherer.regions(changed, resized.shape)
+                plans.append((frame_index, resized.shape, changed, boxes))
+                regions.extend(resized[y0:y1, x0:x1] for y0, y1, x0, x1 in boxes)
+
+                self._decoded += 1
+                redone = sum((y1 - y0) * (x1 - x0) for y0, y1, x0, x1 in boxes)
+                skipped += 1.0 - redone / float(resized.shape[0] * resized.shape[1])
+                self.skipped_fraction = skipped / self._decoded
+            if not regions:
+                yield plans, None, ()
+            else:
+                yield plans, _dither_regions, (regions, threshold_value, dither_method, palette_method,
+                                               ditherer.seed)
+
+    def _pooled(self, tasks):
+        """(key, result) of every (key, task, arguments) in order, run in the process pool.
+
+        A task of None stands for an empty result without a trip to the pool.
+        """
+        pending = deque()
+        # Spawn, as forking a process that runs Qt and threads is unsafe
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+            reading = True
+            try:
+                while True:
+                    # Keep the pool busy; the decoder runs ahead by at most
+                    # max_in_flight queued frames on top of these
+                    while reading and len(pending) < self.max_in_flight:
+                        item = next(tasks, None)
+                        if item is None:
+                            reading = False
+                            break
+                        key, task, arguments = item
+                        pending.append((key, pool.submit(task, *arguments) if task is not None else None))
+
+                    if not pending:
+                        return
+
+                    key, future = pending.popleft()
+                    yield key, future.result() if future is not None else []
+            finally:
+                for _, future in pending:
+                    if future is not None:
+                        future.cancel()
+
+    def _pooled_frames(self, stream):
+        """(frame_index, dithered frame) in order, dithered in the process pool."""
+        frames = iter(stream.start())
+        if not self.temporal:
+            pooled = self._pooled(self._frame_tasks(frames))
+            try:
+                for indices, results in pooled:
+                    yield from zip(indices, results)
+            finally:
+                pooled.close()
+            return
+
+        from temporal import TemporalDitherer
+
+        _, threshold_value, dither_method, palette_method = self.settings
+        ditherer = TemporalDitherer(threshold_value, dither_method, palette_method)
+        pooled = self._pooled(self._temporal_tasks(frames, ditherer))
+        try:
+            for plans, results in pooled:
+                crops = iter(results)
+                for frame_index, shape, changed, boxes in plans:
+                    dithered = ditherer.paste(shape, boxes, [next(crops) for _ in boxes])
+                    yield frame_index, ditherer.apply(dithered, changed)
+        finally:
+            pooled.close()
+
+    def _incremental_frames(self, stream):
+        """(frame_index, dithered frame) in order, redoing only what changed."""
+        import utils
+        from incremental import IncrementalDitherer
+        from methods import prepare_pixels
+        from temporal import TemporalDitherer
+
+        scale_percent, threshold_value, dither_method, palette_method = self.settings
+        temporal = None
+        if self.temporal:
+            temporal = TemporalDitherer(threshold_value, dither_method, palette_method)
+        ditherer = IncrementalDitherer(threshold_value, dither_method, palette_method,
+                                       temporal.seed if temporal else None)
+
+        skipped = 0.0
+        for frame_index, frame_rgb in stream.start():
+            self._decoded += 1
+            resized = prepare_pixels(Image.fromarray(frame_rgb), scale_percent)
+            frame = np.asarray(utils.numpy2pil(ditherer.dither(resized)))
+            if temporal is not None:
+                frame = temporal.compose(resized, frame)
+            skipped += ditherer.skipped_fraction
+            self.skipped_fraction = skipped / self._decoded
+            yield frame_index, frame
+
+    def run(self):
+        """Export all frames, returning how many were written."""
+        from video import FrameStream
+
+        stream = FrameStream(self.video_path, max_queued=self.max_in_flight)
+        if not stream.is_opened():
+            print(f"Error: Could not open video file: {self.video_path}")
+            stream.close()
+            self.writer.close()
+            return 0
+
+        total = stream.reader.frame_count
+        written = 0
+        self._decoded = 0
+        self.skipped_fraction = 0.0
+        if self.incremental:
+            frames = self._incremental_frames(stream)
+        else:
+            frames = self._pooled_frames(stream)
+        try:
+            for index, frame in frames:
+                if self.cancelled:
+                    break
+                self.writer.write(index, frame)
+                written += 1
+                if self.progress_callback:
+                    self.progress_callback(written, max(total, self._decoded))
+        finally:
+            frames.close()
+            stream.close()
+            self.writer.close()
+
+        return written
@@ -0,0 +1,163 @@
+"""Headless batch dithering of images and videos.
+
+Runs the same methods as the GUI without loading Qt, e.g.
+
+    cd src && python -m cli photos/*.jpg clip.mp4 --method atkinson --palette c64 --scale 50
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class Throughput:
+    """Frames and megapixels processed over wall time."""
+    def __init__(self):
+        self.frames = 0
+        self.megapixels = 0.0
+        self._start = time.perf_counter()
+
+    def add(self, width, height):
+        self.frames += 1
+        self.megapixels += width * height / 1e6
+
+    def absorb(self, other):
+        self.frames += other.frames
+        self.megapixels += other.megapixels
+
+    def report(self):
+        elapsed = max(time.perf_counter() - self._start, 1e-9)
+        return (f"{self.frames} frames, {self.megapixels:.1f} MP in {elapsed:.2f}s "
+                f"({self.frames / elapsed:.2f} frames/s, {self.megapixels / elapsed:.2f} MP/s)")
+
+
+def expand_inputs(patterns):
+    """Expand globs into (paths, skipped); skipped are neither images nor videos."""
+    paths = []
+    skipped = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        for path in matches:
+            if not os.path.isfile(path):
+                print(f"Skipping {path}: not a file", file=sys.stderr)
+                skipped.append(path)
+            elif not path.lower().endswith(IMAGE_EXTENSIONS + VIDEO_EXTENSIONS):
+                print(f"Skipping {path}: unsupported file type", file=sys.stderr)
+                skipped.append(path)
+            else:
+                paths.append(path)
+    return paths, skipped
+
+
+def process_image_file(path, args, throughput):
+    import utils
+    from methods import dither_image
+
+    image = utils.open_image(path)
+    result = dither_image(image, args.scale, args.threshold, args.method, args.palette)
+    throughput.add(result.width, result.height)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    base_name = os.path.splitext(os.path.basename(path))[0]
+    result.save(os.path.join(args.output_dir, f"{base_name}_dithered.{args.format}"))
+
+
+class _CountingWriter:
+    """Passes frames to a writer and counts them for the throughput report."""
+    def __init__(self, writer, throughput):
+        self.writer = writer
+        self.throughput = throughput
+
+    def write(self, frame_index, frame):
+        self.writer.write(frame_index, frame)
+        self.throughput.add(frame.shape[1], frame.shape[0])
+
+    def close(self):
+        self.writer.close()
+
+
+def process_video_file(path, args, throughput):
+    from batch_export import BatchExporter, ImageSequenceWriter, make_writer, probe_video
+
+    base_name = os.path.splitext(os.path.basename(path))[0]
+    if args.video_format == 'frames':
+        writer = ImageSequenceWriter(os.path.join(args.output_dir, f"{base_name}_results"), args.format)
+    else:
+        # Encode straight into one file at the source frame rate
+        os.makedirs(args.output_dir, exist_ok=True)
+        _, fps = probe_video(path)
+        output_path = os.path.join(args.output_dir, f"{base_name}_dithered.{args.video_format}")
+        writer = make_writer(output_path, fps)
+    exporter = BatchExporter(path, _CountingWriter(writer, throughput), args.scale, args.threshold,
+                             args.method, args.palette, workers=args.workers, temporal=args.temporal,
+                             incremental=args.incremental)
+    if exporter.run() == 0:
+        raise RuntimeError("no frames could be read")
+    if args.incremental or args.temporal:
+        print(f"{path}: skipped {exporter.skipped_fraction:.0%} of the dither work")
+
+
+def build_parser():
+    import palette
+    from methods import available_methods
+
+    parser = argparse.ArgumentParser(prog='python -m cli', description="Dither images and videos without the GUI.")
+    parser.add_argument('inputs', nargs='+', help='image or video files, globs allowed')
+    parser.add_argument('-m', '--method', default='bayer4x4', choices=list(available_methods))
+    parser.add_argument('-p', '--palette', default='1bit_gray', choices=list(palette.available_palettes))
+    parser.add_argument('-s', '--scale', type=int, default=100, help='output size in percent (default 100)')
+    parser.add_argument('-t', '--threshold', type=float, default=0.5, help='threshold 0..1 (default 0.5)')
+    parser.add_argument('-o', '--output-dir', default='.', help='where results are written')
+    parser.add_argument('-f', '--format', default='png', choices=['png', 'bmp', 'jpg'],
+                        help='output image format (default png)')
+    parser.add_argument('--video-format', default='frames', choices=['frames', 'mkv', 'avi', 'mov', 'gif', 'apng'],
+                        help='numbered frames (default), a lossless video or an animation')
+    parser.add_argument('--temporal', action='store_true',
+                        help='keep the dither of unchanged pixels between video frames')
+    parser.add_argument('--incremental', action='store_true',
+                        help='re-dither only what changed since the previous video frame, on one core')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='processes for video frames (default: all cores)')
+    return parser
+
+
+def main(argv=None):
+    """Run the CLI; the exit status is 1 when any input was skipped or failed."""
+    args = build_parser().parse_args(argv)
+    if not 1 <= args.scale <= 100:
+        print("Error: --scale must be between 1 and 100", file=sys.stderr)
+        return 2
+
+    paths, skipped = expand_inputs(args.inputs)
+    if not paths:
+        print("Error: no input files", file=sys.stderr)
+        return 1
+
+    failed = len(skipped)
+    total = Throughput()
+    for path in paths:
+        throughput = Throughput()
+        try:
+            if path.lower().endswith(VIDEO_EXTENSIONS):
+                process_video_file(path, args, throughput)
+            else:
+                process_image_file(path, args, throughput)
+        except Exception as e:
+            print(f"Error processing {path}: {e}", file=sys.stderr)
+            failed += 1
+        print(f"{path}: {throughput.report()}")
+        total.absorb(throughput)
+
+    print(f"Total: {total.report()}")
+    if failed:
+        print(f"Error: {failed} of {len(paths) + len(skipped)} inputs failed", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
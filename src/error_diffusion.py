@@ -1,28 +1,32 @@
 from collections import OrderedDict
 import numpy as np
 
+import jobs
+import palette_index
+
+# Current pixel is the center column of the first row
 _diffusion_matrices_fast = {
     'floyd_steinberg': np.array([
-        [0, 0, 7, 0, 0],
-        [3, 5, 1, 0, 0],
+        [0, 0, 0, 7, 0],
+        [0, 3, 5, 1, 0],
         [0, 0, 0, 0, 0]
     ], dtype=np.float32) / 16.0,
 
     'atkinson': np.array([
-        [0, 0, 1, 1, 0],
-        [1, 1, 1, 0, 0],
-        [0, 1, 0, 0, 0]
+        [0, 0, 0, 1, 1],
+        [0, 1, 1, 1, 0],
+        [0, 0, 1, 0, 0]
     ], dtype=np.float32) / 8.0,
 
     'burkes': np.array([
-        [0, 0, 8, 4, 0],
+        [0, 0, 0, 8, 4],
         [2, 4, 8, 4, 2],
         [0, 0, 0, 0, 0]
     ], dtype=np.float32) / 32.0,
 
     'sierra_lite': np.array([
-        [0, 0, 2, 0, 0],
-        [1, 1, 0, 0, 0],
+        [0, 0, 0, 2, 0],
+        [0, 1, 1, 0, 0],
         [0, 0, 0, 0, 0]
     ], dtype=np.float32) / 4.0,
 }
@@ -30,6 +34,8 @@ _diffusion_matrices_fast = {
 class ErrorDiffusionOptimizer:
     def __init__(self):
         self.palette_cache = {}
+        self.index_cache = {}
+        self.kernel_cache = {}
 
     def get_palette_array(self, palette_name):
         if palette_name not in self.palette_cache:
@@ -37,6 +43,21 @@ class ErrorDiffusionOptimizer:
             self.palette_cache[palette_name] = np.array(palette.palettes[palette_name], dtype=np.float32)
         return self.palette_cache[palette_name]
 
+    def get_palette_index(self, palette_name):
+        # None for palettes small enough for brute force
+        if palette_name not in self.index_cache:
+            self.index_cache[palette_name] = palette_index.build_palette_index(
+                self.get_palette_array(palette_name))
+        return self.index_cache[palette_name]
+
+    def get_kernel(self, diffusion_matrix):
+        # Keyed by contents: an id could be reused by another array once
+        # a matrix is garbage collected
+        key = (diffusion_matrix.shape, diffusion_matrix.tobytes())
+        if key not in self.kernel_cache:
+            self.kernel_cache[key] = _compile_kernel(diffusion_matrix)
+        return self.kernel_cache[key]
+
 
 _diffusion_optimizer = ErrorDiffusionOptimizer()
 
@@ -44,7 +65,36 @@ def closest_color_fast(pixel, palette_array):
     distances = np.sum((palette_array - pixel) ** 2, axis=1)
     return palette_array[np.argmin(distances)]
 
-def _error_diffusion(image_matrix, palette_name, diffusion_matrix, threshold=0.5):
+def _compile_kernel(diffusion_matrix):
+    """Turn a diffusion matrix into pull taps and the wavefront skew."""
+    center_x = diffusion_matrix.shape[1] // 2
+
+    # Taps as seen from the receiving pixel: (rows up, columns left, coeff).
+    # Sorted so sources come in the same raster order the scan visits them,
+    # which keeps float accumulation order identical to the reference loop.
+    taps = []
+    for dy in range(diffusion_matrix.shape[0] - 1, -1, -1):
+        for dx in range(diffusion_matrix.shape[1] - 1, -1, -1):
+            coeff = diffusion_matrix[dy, dx]
+            if coeff != 0:
+                taps.append((dy, dx - center_x, coeff))
+
+    # Pixel (y, x) is scanned at step x + skew * y; the skew must put every
+    # source of a pixel on an earlier step
+    skew = 1
+    for dy, ox, _ in taps:
+        if dy > 0:
+            skew = max(skew, -ox // dy + 1)
+
+    return taps, skew
+
+def _error_diffusion_reference(image_matrix, palette_name, diffusion_matrix, threshold=0.5, legacy=False):
+    """Plain per-pixel scan, kept as the reference for _error_diffusion.
+
+    legacy=True runs the loop as it was before error diffusion was fixed:
+    old_pixel was a view of the pixel that was just overwritten, so the
+    error was always zero and nothing was diffused.
+    """
     new_matrix = np.copy(image_matrix)
     rows, cols, _ = image_matrix.shape
 
@@ -55,7 +105,7 @@ def _error_diffusion(image_matrix, palette_name, diffusion_matrix, threshold=0.5
 
     for y in range(rows):
         for x in range(cols):
-            old_pixel = new_matrix[y, x]
+            old_pixel = new_matrix[y, x] if legacy else new_matrix[y, x].copy()
 
             # Apply threshold as bias
             adjusted_pixel = old_pixel + (threshold - 0.5) * 0.5
@@ -78,6 +128,124 @@ def _error_diffusion(image_matrix, palette_name, diffusion_matrix, threshold=0.5
 
     return new_matrix
 
+def _scan_band(work, errors, palette_array, color_index, geometry, row_begin, row_end):
+    """Run the wavefront over rows [row_begin, row_end) of a padded buffer."""
+    cols, skew, origin, stride, tap_offsets, bias = geometry
+
+    for step in range(skew * row_begin, cols + skew * (row_end - 1)):
+        jobs.check_cancelled()
+
+        y_first = max(row_begin, -(-(step - cols + 1) // skew))
+        y_last = min(row_end - 1, step // skew)
+
+        start = origin + step + y_first * stride
+        stop = origin + step + y_last * stride + 1
+        diagonal = slice(start, stop, stride)
+
+        old_pixels = work[diagonal].copy()
+        for offset, coeff in tap_offsets:
+            old_pixels += errors[start - offset:stop - offset:stride] * coeff
+
+        # Apply threshold as bias
+        adjusted = np.clip(old_pixels + bias, 0.0, 1.0)
+
+        if color_index is not None:
+            new_pixels = palette_array[color_index.query(adjusted)]
+        else:
+            diff = palette_array[np.newaxis, :, :] - adjusted[:, np.newaxis, :]
+            diff *= diff
+            distances = diff[:, :, 0] + diff[:, :, 1] + diff[:, :, 2]
+            new_pixels = palette_array[np.argmin(distances, axis=1)]
+
+        work[diagonal] = new_pixels
+        errors[diagonal] = old_pixels - new_pixels
+
+def _setup_scan(image_matrix, diffusion_matrix, threshold, legacy=False):
+    """Padded work and error buffers plus the scan geometry for an image."""
+    rows, cols, _ = image_matrix.shape
+    taps, skew = _diffusion_optimizer.get_kernel(diffusion_matrix)
+    if legacy:
+        # The legacy loop spreads only zero error, so no pixel pulls any
+        taps = []
+
+    # Pad so that every tap reads inside the buffer; padding keeps zero error
+    pad_top = diffusion_matrix.shape[0] - 1
+    pad_x = diffusion_matrix.shape[1] // 2
+    padded_cols = cols + 2 * pad_x
+    padded_rows = rows + pad_top
+
+    dtype = np.result_type(image_matrix.dtype, np.float32)
+    work = np.zeros((padded_rows, padded_cols, 3), dtype=dtype)
+    work[pad_top:, pad_x:pad_x + cols] = image_matrix
+    work = work.reshape(-1, 3)
+    errors = np.zeros_like(work)
+
+    # Flat offset of every source relative to the receiving pixel
+    tap_offsets = [(dy * padded_cols + ox, coeff) for dy, ox, coeff in taps]
+    geometry = (cols, skew, pad_top * padded_cols + pad_x, padded_cols - skew,
+                tap_offsets, (threshold - 0.5) * 0.5)
+    return work, errors, geometry, (pad_top, pad_x, padded_rows, padded_cols)
+
+def _image_view(work, layout, rows, cols):
+    """The unpadded (rows, cols, 3) part of a flat work buffer."""
+    pad_top, pad_x, padded_rows, padded_cols = layout
+    return work.reshape(padded_rows, padded_cols, 3)[pad_top:pad_top + rows, pad_x:pad_x + cols]
+
+def _error_diffusion(image_matrix, palette_name, diffusion_matrix, threshold=0.5, legacy=False):
+    """Error diffusion scanned as a skewed wavefront.
+
+    All pixels on one anti-diagonal are independent, so each step quantizes
+    a whole diagonal at once. Instead of pushing error forward, every pixel
+    pulls it from already finished neighbours, which gives output identical
+    to _error_diffusion_reference with the same legacy flag. legacy=True
+    gives the output of the methods before the diffusion fix bit for bit.
+    """
+    rows, cols, _ = image_matrix.shape
+    palette_array = _diffusion_optimizer.get_palette_array(palette_name)
+    color_index = _diffusion_optimizer.get_palette_index(palette_name)
+    work, errors, geometry, layout = _setup_scan(image_matrix, diffusion_matrix, threshold, legacy)
+    _scan_band(work, errors, palette_array, color_index, geometry, 0, rows)
+
+    return _image_view(work, layout, rows, cols).copy()
+
+class DiffusionScan:
+    """Error diffusion that can redo a frame from its first changed row.
+
+    The output and error buffers of the last scan are kept. A pixel only
+    depends on pixels scanned before it, so when a new frame equals the
+    previous one above first_row, scanning from first_row on gives the
+    same result as a full scan.
+    """
+    def __init__(self, method_name, palette_name, threshold=0.5):
+        self.diffusion_matrix = _diffusion_matrices_fast[method_name]
+        self.palette_name = palette_name
+        self.threshold = threshold
+        self._state = None
+
+    def reset(self):
+        self._state = None
+
+    def run(self, image_matrix, first_row=0):
+        """Dithered image_matrix, rescanning rows from first_row on."""
+        rows, cols, _ = image_matrix.shape
+        palette_array = _diffusion_optimizer.get_palette_array(self.palette_name)
+        color_index = _diffusion_optimizer.get_palette_index(self.palette_name)
+
+        # A cancelled scan leaves the buffers half done, so they are only
+        # kept again once it finished
+        state, self._state = self._state, None
+        if state is None or state[0] != image_matrix.shape or first_row <= 0:
+            work, errors, geometry, layout = _setup_scan(image_matrix, self.diffusion_matrix, self.threshold)
+            first_row = 0
+        else:
+            _, work, errors, geometry, layout = state
+            # Rows above first_row keep their output and error from last time
+            _image_view(work, layout, rows, cols)[first_row:] = image_matrix[first_row:]
+
+        _scan_band(work, errors, palette_array, color_index, geometry, first_row, rows)
+        self._state = (image_matrix.shape, work, errors, geometry, layout)
+        return _image_view(work, layout, rows, cols).copy()
+
 _method_names_fast = ['floyd_steinberg', 'atkinson', 'burkes', 'sierra_lite']
 
 def _create_method(matrix_name):
@@ -0,0 +1,1195 @@
+import os
+import zlib
+
+# Fix Qt plugin conflict with OpenCV
+os.environ['QT_QPA_PLATFORM_PLUGIN_PATH'] = ''
+
+import webbrowser
+import threading
+from collections import namedtuple
+
+# Cache key structure for better readability
+CacheKey = namedtuple('CacheKey', ['source', 'scale_percent', 'threshold_value', 'dither_method', 'palette_method'])
+SourceKey = namedtuple('SourceKey', ['path', 'mtime_ns', 'size', 'frame_index'])
+
+from PIL import Image
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
+                             QHBoxLayout, QPushButton, QLabel, QGroupBox,
+                             QFileDialog, QSlider, QComboBox, QProgressDialog, QCheckBox)
+from PyQt6.QtCore import Qt, QTimer, QObject, pyqtSignal
+from PyQt6.QtGui import QPixmap
+import palette
+import utils
+from methods import available_methods, matrix_indices, prepare_pixels, preview_indices
+from batch_export import BatchExporter, ImageSequenceWriter, make_writer
+from video import VideoReader
+from result_cache import DitherResult, ResultCache
+import jobs
+from incremental import IncrementalDitherer
+from stats import Stats, StatsDumper, format_snapshot
+
+class VideoLoader:
+    """Background decoder keeping a window of frames around the playhead.
+
+    Frames in the direction of travel are prefetched first, a smaller share
+    is kept behind. The window holds as many frames as fit in memory_budget
+    and frames farthest from the playhead are evicted first. stats holds
+    decode times, hit and eviction counts and the window's fill.
+    """
+    DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+    # Upper bound on the window so picking the next frame stays cheap
+    MAX_WINDOW_FRAMES = 1024
+    # Share of the window kept behind the direction of travel
+    BEHIND_FRACTION = 0.25
+
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET):
+        self.memory_budget = memory_budget
+        self.frame_cache = {}
+        self.loader_thread = None
+        self.stop_loading = False
+        self._condition = threading.Condition()
+        self._reset_window()
+
+        self.stats = Stats('video_loader')
+        self.stats.watch('window_frames', lambda: len(self.frame_cache))
+        self.stats.watch('window_mb', lambda: self._cached_bytes / 2 ** 20)
+        self.stats.watch('ahead', self._frames_ahead)
+
+    def _frames_ahead(self):
+        """Decoded frames waiting in the direction of travel."""
+        with self._condition:
+            playhead, direction = self._playhead, self._direction
+            return sum(1 for i in list(self.frame_cache) if (i - playhead) * direction > 0)
+
+    def _reset_window(self):
+        self.frame_cache.clear()
+        self._cached_bytes = 0
+        self._frame_bytes = 0
+        self._frame_count = 0
+        self._playhead = 0
+        self._direction = 1
+
+    def start_loading(self, video_path):
+        self._stop_thread()
+
+        with self._condition:
+            self.stop_loading = False
+            self._reset_window()
+        try:
+            self.loader_thread = threading.Thread(target=self._load_frames, args=(video_path,))
+            self.loader_thread.daemon = True
+            self.loader_thread.start()
+        except Exception as e:
+            print(f"Error starting loader thread: {e}")
+            self.stop_loading = True
+
+    def _stop_thread(self):
+        with self._condition:
+            self.stop_loading = True
+            self._condition.notify_all()
+        if self.loader_thread and self.loader_thread.is_alive():
+            try:
+                self.loader_thread.join(timeout=1.0)
+            except Exception as e:
+                print(f"Error stopping loader thread: {e}")
+
+    def _window(self):
+        """First and last frame index of the window, inclusive."""
+        if self._frame_bytes:
+            capacity = max(1, min(self.memory_budget // self._frame_bytes, self.MAX_WINDOW_FRAMES))
+        else:
+            capacity = 1
+        behind = int(capacity * self.BEHIND_FRACTION)
+        ahead = capacity - behind - 1
+        if self._direction < 0:
+            ahead, behind = behind, ahead
+        # Near either end of the video the window shifts inside it
+        low = max(0, min(self._playhead - behind, self._frame_count - capacity))
+        high = min(self._frame_count - 1, low + capacity - 1)
+        return low, high
+
+    def _prefetch_order(self, low, high):
+        playhead = self._playhead
+        yield playhead
+        if self._direction >= 0:
+            yield from range(playhead + 1, high + 1)
+            yield from range(playhead - 1, low - 1, -1)
+        else:
+            # Step back in blocks, decoding each block forward without seeks
+            block = VideoReader.MAX_GRAB_AHEAD
+            for block_end in range(playhead, low, -block):
+                yield from range(max(low, block_end - block), block_end)
+            yield from range(playhead + 1, high + 1)
+
+    def _next_missing(self):
+        low, high = self._window()
+        if low > high:
+            return None
+        for frame_index in self._prefetch_order(low, high):
+            if frame_index not in self.frame_cache:
+                return frame_index
+        return None
+
+    def _store(self, frame_index, frame):
+        if frame_index in self.frame_cache:
+            return
+        self._frame_bytes = frame.nbytes
+        self.frame_cache[frame_index] = frame
+        self._cached_bytes += frame.nbytes
+        self._evict()
+
+    def _evict(self):
+        low, high = self._window()
+        playhead = self._playhead
+        for frame_index in [i for i in self.frame_cache if not low <= i <= high]:
+            self._cached_bytes -= self.frame_cache.pop(frame_index).nbytes
+            self.stats.count('evictions')
+        while self._cached_bytes > self.memory_budget and len(self.frame_cache) > 1:
+            farthest = max(self.frame_cache, key=lambda i: abs(i - playhead))
+            self._cached_bytes -= self.frame_cache.pop(farthest).nbytes
+            self.stats.count('evictions')
+
+    def _load_frames(self, video_path):
+        reader = None
+        try:
+            reader = VideoReader(video_path)
+            if not reader.is_opened():
+                print(f"Error: Could not open video file: {video_path}")
+                return
+
+            with self._condition:
+                self._frame_count = reader.frame_count
+            while True:
+                with self._condition:
+                    frame_index = self._next_missing()
+                    while frame_index is None and not self.stop_loading:
+                        self._condition.wait()
+                        frame_index = self._next_missing()
+                    if self.stop_loading:
+                        break
+
+                # The reader continues sequentially and seeks on jumps
+                with self.stats.stage('decode'):
+                    frame = reader.read(frame_index)
+
+                with self._condition:
+                    if frame is None:
+                        # The container overstated its length
+                        self._frame_count = min(self._frame_count, frame_index)
+                    else:
+                        self._store(frame_index, frame)
+        except Exception as e:
+            print(f"Error in video loading: {e}")
+        finally:
+            if reader:
+                reader.close()
+
+    def set_playhead(self, frame_index):
+        """Move the window to frame_index and prefetch from there."""
+        with self._condition:
+            if frame_index != self._playhead:
+                self._direction = 1 if frame_index > self._playhead else -1
+                self._playhead = frame_index
+                self._condition.notify_all()
+
+    def store(self, frame_index, frame):
+        """Add a frame decoded elsewhere, if it falls inside the window."""
+        with self._condition:
+            low, high = self._window()
+            if low <= frame_index <= high:
+                self._store(frame_index, frame)
+
+    def get_frame(self, frame_index):
+        with self._condition:
+            frame = self.frame_cache.get(frame_index, None)
+        self.stats.count('misses' if frame is None else 'hits')
+        return frame
+
+    def cleanup(self):
+        self._stop_thread()
+        with self._condition:
+            self._reset_window()
+
+class ExportSignals(QObject):
+    # Emitted from the export thread, delivered on the GUI thread
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(int)
+
+def _image_nbytes(image):
+    return image.width * image.height * len(image.getbands())
+
+class ImageProcessor:
+    """Dithers frames through three cached stages.
+
+    The decoded source is kept per file or video frame, the resized uint8
+    matrix per source and scale, and the result as compact palette indices
+    per full setting. A threshold, method or palette change only re-runs
+    the dither stage. Pixmaps are built from the cached indices on display.
+    Video frames are dithered incrementally against the frame before.
+    Stage times, cache counters and sizes are collected in stats once it
+    is enabled.
+    """
+    DEFAULT_SOURCE_BYTES = 128 * 1024 * 1024
+    DEFAULT_MATRIX_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, max_cache_bytes=ResultCache.DEFAULT_MAX_BYTES,
+                 max_source_bytes=DEFAULT_SOURCE_BYTES, max_matrix_bytes=DEFAULT_MATRIX_BYTES):
+        self._sources = ResultCache(max_source_bytes, sizeof=_image_nbytes)
+        self._matrices = ResultCache(max_matrix_bytes)
+        self._cache = ResultCache(max_cache_bytes)
+        self._frame_ditherer = None
+        self._frame_lock = threading.Lock()
+
+        self.stats = Stats('image_processor')
+        for name, cache in (('source', self._sources), ('matrix', self._matrices), ('result', self._cache)):
+            self._watch_cache(name, cache)
+        self.stats.watch('incremental_skipped',
+                         lambda: self._frame_ditherer.skipped_fraction if self._frame_ditherer else 0.0)
+
+    def _watch_cache(self, name, cache):
+        self.stats.watch(f'{name}_hits', lambda: cache.hits)
+        self.stats.watch(f'{name}_misses', lambda: cache.misses)
+        self.stats.watch(f'{name}_evictions', lambda: cache.evictions)
+        self.stats.watch(f'{name}_entries', lambda: len(cache))
+        self.stats.watch(f'{name}_mb', lambda: cache.nbytes / 2 ** 20)
+
+    @staticmethod
+    def source_key(path, frame_index=None):
+        """Identity of a still file or a video frame, without reading pixels.
+
+        Modification time and size make an edited file a new source.
+        """
+        stat = os.stat(path)
+        return SourceKey(os.path.abspath(path), stat.st_mtime_ns, stat.st_size, frame_index)
+
+    @staticmethod
+    def _content_key(image_data):
+        # Images without a known source fall back to a fast content hash
+        if hasattr(image_data, 'tobytes'):
+            data = image_data.tobytes()
+            return image_data.size, image_data.mode, zlib.crc32(data), len(data)
+        return zlib.crc32(str(image_data).encode())
+
+    def _get_source(self, image, source):
+        cached = self._sources.get(source)
+        if cached is not None:
+            return cached
+        if callable(image):
+            with self.stats.stage('decode'):
+                image = image()
+        if image is not None:
+            self._sources.put(source, image)
+        return image
+
+    def _get_matrix(self, image, source, scale_percent):
+        key = (source, scale_percent)
+        matrix = self._matrices.get(key)
+        if matrix is None:
+            image = self._get_source(image, source)
+            if image is None:
+                return None
+            with self.stats.stage('resize'):
+                matrix = prepare_pixels(image, scale_percent)
+            # Shared by every dither of this source and scale
+            matrix.flags.writeable = False
+            self._matrices.put(key, matrix)
+        return matrix
+
+    def _resolve_source(self, image, source):
+        if source is None:
+            if callable(image):
+                with self.stats.stage('decode'):
+                    image = image()
+            with self.stats.stage('hash'):
+                source = self._content_key(image)
+        return image, source
+
+    def _frame_indices(self, matrix, threshold_value, dither_method, palette_method):
+        # Another thread using the ditherer gets a plain full dither
+        if not self._frame_lock.acquire(blocking=False):
+            return matrix_indices(matrix, threshold_value, dither_method, palette_method)
+        try:
+            ditherer = self._frame_ditherer
+            if ditherer is None or ditherer.settings != (threshold_value, dither_method, palette_method):
+                ditherer = IncrementalDitherer(threshold_value, dither_method, palette_method)
+                self._frame_ditherer = ditherer
+            result = ditherer.dither(matrix)
+        finally:
+            self._frame_lock.release()
+        return utils.palette_indices(result, palette_method)
+
+    def cached_result(self, source, scale_percent, threshold_value, dither_method, palette_method):
+        """The cached DitherResult for these settings, None if not rendered yet."""
+        return self._cache.get(CacheKey(source, scale_percent, threshold_value, dither_method, palette_method))
+
+    def render(self, image, scale_percent, threshold_value, dither_method, palette_method, source=None):
+        """DitherResult of the image, from the caches when possible.
+
+        image is a PIL image or a function returning one; a function is
+        only called when the decoded source is not cached.
+        """
+        image, source = self._resolve_source(image, source)
+        cache_key = CacheKey(source, scale_percent, threshold_value, dither_method, palette_method)
+
+        result = self._cache.get(cache_key)
+        if result is None:
+            matrix = self._get_matrix(image, source, scale_percent)
+            if matrix is None:
+                return None
+            jobs.check_cancelled()
+            with self.stats.stage('dither'):
+                if isinstance(source, SourceKey) and source.frame_index is not None:
+                    indices = self._frame_indices(matrix, threshold_value, dither_method, palette_method)
+                else:
+                    indices = matrix_indices(matrix, threshold_value, dither_method, palette_method)
+            with self.stats.stage('pack'):
+                result = DitherResult(indices, palette_method)
+            self._cache.put(cache_key, result)
+        return result
+
+    def preview(self, image, scale_percent, threshold_value, dither_method, palette_method, source=None):
+        """Small approximate DitherResult, None when render() is as cheap."""
+        image, source = self._resolve_source(image, source)
+        image = self._get_source(image, source)
+        if image is None:
+            return None
+        with self.stats.stage('preview'):
+            indices = preview_indices(image, scale_percent, threshold_value, dither_method, palette_method)
+        if indices is None:
+            return None
+        return DitherResult(indices, palette_method)
+
+    def to_pixmap(self, result):
+        with self.stats.stage('pixmap'):
+            return QPixmap.fromImage(result.to_qimage())
+
+    def process_frame(self, image, scale_percent, threshold_value, dither_method, palette_method, source=None):
+        """Pixmap of the exact dithered image, rendered on the calling thread."""
+        try:
+            result = self.render(image, scale_percent, threshold_value, dither_method, palette_method, source)
+            if result is None:
+                return None
+            return self.to_pixmap(result)
+        except Exception as e:
+            print(f"Error processing frame: {e}")
+            return None
+
+    def clear_cache(self):
+        self._sources.clear()
+        self._matrices.clear()
+        self._cache.clear()
+        self._frame_ditherer = None
+
+
+class RenderSignals(QObject):
+    # Emitted from the render thread with (generation, DitherResult);
+    # a job may post a preview before its exact result
+    rendered = pyqtSignal(int, object)
+
+class RenderWorker:
+    """Runs render jobs on one background thread, newest request only.
+
+    A job loads the source, posts a quick preview when the image is large
+    and then the exact result. A new request replaces one still waiting
+    and cancels the running one, which stops at its next check_cancelled.
+    Every request gets a generation number so stale posts can be ignored.
+    """
+    def __init__(self, image_processor):
+        self.stats = Stats('render_worker')
+        self.stats.watch('pending', lambda: int(self._pending is not None))
+        self.stats.watch('running', lambda: int(self._running_token is not None))
+        self.image_processor = image_processor
+        self.signals = RenderSignals()
+        self._condition = threading.Condition()
+        self._pending = None
+        self._running_token = None
+        self._generation = 0
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def submit(self, image, scale_percent, threshold_value, dither_method, palette_method, source=None):
+        """Queue a render, superseding every earlier request."""
+        with self._condition:
+            self._cancel_locked()
+            self._pending = (self._generation,
+                             (image, scale_percent, threshold_value, dither_method, palette_method, source))
+            self._condition.notify()
+            return self._generation
+
+    def cancel(self):
+        """Drop the waiting request and cancel the running one."""
+        with self._condition:
+            self._cancel_locked()
+
+    def _cancel_locked(self):
+        self._generation += 1
+        if self._pending is not None:
+            self.stats.count('superseded')
+        self._pending = None
+        if self._running_token is not None:
+            self._running_token.cancel()
+
+    def stop(self):
+        with self._condition:
+            self._cancel_locked()
+            self._stopped = True
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                generation, request = self._pending
+                self._pending = None
+                token = self._running_token = jobs.CancelToken()
+
+            try:
+                with jobs.running(token), self.stats.stage('job'):
+                    self._render(generation, request)
+            except jobs.Cancelled:
+                self.stats.count('cancelled')
+            except Exception as e:
+                print(f"Error processing frame: {e}")
+            finally:
+                with self._condition:
+                    self._running_token = None
+
+    def _render(self, generation, request):
+        preview = self.image_processor.preview(*request)
+        if preview is not None:
+            self.signals.rendered.emit(generation, preview)
+        jobs.check_cancelled()
+        result = self.image_processor.render(*request)
+        # A request that came in while the last palette pass ran must not
+        # be overtaken by this stale result
+        jobs.check_cancelled()
+        if result is not None:
+            self.signals.rendered.emit(generation, result)
+
+
+# noinspection PyUnresolvedReferences
+class MainWindow(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self._setup_window()
+        self._initialize_settings()
+        self._setup_components()
+        self._setup_timers()
+        self._setup_ui()
+    
+    def _setup_window(self):
+        """Configure main window properties."""
+        self.setWindowTitle("YABM Generator")
+        self.setGeometry(100, 100, 1280, 720)
+    
+    def _initialize_settings(self):
+        """Initialize application settings and state variables."""
+        # Settings
+        self.dither_method = 'bayer4x4'
+        self.palette_method = '1bit_gray'
+        self.index = 0
+
+        # Video settings
+        self.video_reader = None
+        self.video_frames = []
+        self.current_frame_index = 0
+        self.total_frames = 0
+        self.is_video_loaded = False
+        self.fps = 0
+    
+    def _setup_components(self):
+        """Initialize core components."""
+        self.video_loader = VideoLoader()
+        self.image_processor = ImageProcessor()
+
+        # Exact renders run in the background behind a quick preview
+        self._render_worker = RenderWorker(self.image_processor)
+        self._render_worker.signals.rendered.connect(self._on_rendered)
+
+        # Background batch export
+        self._exporter = None
+        self._export_progress = None
+        self._export_signals = ExportSignals()
+        self._export_signals.progress.connect(self._on_export_progress)
+        self._export_signals.finished.connect(self._on_export_finished)
+
+        self._setup_stats()
+
+    def _all_stats(self):
+        return [self.image_processor.stats, self.video_loader.stats, self._render_worker.stats]
+
+    def _setup_stats(self):
+        """Collect stats from the start when YABM_STATS is set.
+
+        YABM_STATS_DUMP names a .jsonl or .csv file that snapshots are
+        appended to every YABM_STATS_INTERVAL seconds (default 5).
+        """
+        self._stats_dumper = None
+        dump_path = os.environ.get('YABM_STATS_DUMP')
+        self._stats_always_on = bool(os.environ.get('YABM_STATS') or dump_path)
+        self._set_stats_enabled(self._stats_always_on)
+        if dump_path:
+            interval = float(os.environ.get('YABM_STATS_INTERVAL', 5.0))
+            self._stats_dumper = StatsDumper(self._all_stats(), dump_path, interval)
+            self._stats_dumper.start()
+
+    def _set_stats_enabled(self, enabled):
+        for stats in self._all_stats():
+            stats.enabled = enabled
+    
+    def _setup_timers(self):
+        """Configure application timers."""
+        # Timer for delay
+        self._processing_timer = QTimer()
+        self._processing_timer.setSingleShot(True)
+        self._processing_timer.timeout.connect(self._delayed_process_image)
+
+        # Refreshes the stats overlay while it is shown
+        self._stats_timer = QTimer()
+        self._stats_timer.setInterval(500)
+        self._stats_timer.timeout.connect(self._update_stats_overlay)
+    
+    def _setup_ui(self):
+        """Setup the user interface layout."""
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+
+        main_layout = QHBoxLayout(central_widget)
+        left_panel = self.create_left_panel()
+        right_panel = self.create_right_panel()
+
+        main_layout.addWidget(left_panel, 1)
+        main_layout.addWidget(right_panel, 3)
+
+    def create_left_panel(self):
+        # Creating group for left panel
+        left_group = QGroupBox("Controls")
+        layout = QVBoxLayout()
+
+        # Greet text
+        text_layout = QHBoxLayout()
+        greet_label = QLabel("Yet Another Bitmap Generator")
+        greet_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        text_layout.addWidget(greet_label)
+        layout.addLayout(text_layout)
+
+        # 1 row
+        row2_layout = QHBoxLayout()
+        self.load_image_btn = QPushButton("Load Image")
+        self.load_video_btn = QPushButton("Load Video")
+
+        self.load_image_btn.clicked.connect(self.load_image)
+        self.load_video_btn.clicked.connect(self.load_video)
+
+        row2_layout.addWidget(self.load_image_btn)
+        row2_layout.addWidget(self.load_video_btn)
+        layout.addLayout(row2_layout)
+
+        # 2 row
+        size_layout = QVBoxLayout()
+        size_label = QLabel("Size:")
+        self.size_slider = QSlider(Qt.Orientation.Horizontal)
+        self.size_slider.setMinimum(10)
+        self.size_slider.setMaximum(100)
+        self.size_slider.setValue(50)
+        self.size_slider.valueChanged.connect(self.on_size_changed)
+
+        self.size_value_label = QLabel("50")
+        self.size_value_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
+        size_layout.addWidget(size_label)
+        size_layout.addWidget(self.size_slider)
+        size_layout.addWidget(self.size_value_label)
+        layout.addLayout(size_layout)
+
+        # 3 row
+        threshold_layout = QVBoxLayout()
+        threshold_label = QLabel("Threshold:")
+        self.threshold_slider = QSlider(Qt.Orientation.Horizontal)
+        self.threshold_slider.setMinimum(0)
+        self.threshold_slider.setMaximum(100)
+        self.threshold_slider.setValue(50)
+        self.threshold_slider.valueChanged.connect(self.on_threshold_changed)
+
+        self.threshold_value_label = QLabel("50")
+        self.threshold_value_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
+        threshold_layout.addWidget(threshold_label)
+        threshold_layout.addWidget(self.threshold_slider)
+        threshold_layout.addWidget(self.threshold_value_label)
+        layout.addLayout(threshold_layout)
+
+        # 4 row
+        dither_layout = QVBoxLayout()
+        dither_label = QLabel("Dithering method:")
+        self.dither_combo = QComboBox()
+        self.dither_combo.addItems(available_methods)
+        self.dither_combo.setCurrentText(self.dither_method)
+        self.dither_combo.currentTextChanged.connect(self.on_dither_changed)
+
+        dither_layout.addWidget(dither_label)
+        dither_layout.addWidget(self.dither_combo)
+        layout.addLayout(dither_layout)
+
+        # 5 row
+        palette_layout = QVBoxLayout()
+        palette_label = QLabel("Palette:")
+        self.palette_combo = QComboBox()
+        self.palette_combo.addItems(palette.available_palettes)
+        self.palette_combo.setCurrentText(self.palette_method)
+        self.palette_combo.currentTextChanged.connect(self.on_palette_changed)
+
+        palette_layout.addWidget(palette_label)
+        palette_layout.addWidget(self.palette_combo)
+        layout.addLayout(palette_layout)
+
+        # 6 row
+        self.temporal_check = QCheckBox("Stable video export")
+        self.temporal_check.setToolTip("Keep the dither of unchanged pixels between frames "
+                                       "to reduce flicker and file size")
+        layout.addWidget(self.temporal_check)
+
+        self.stats_check = QCheckBox("Show stats")
+        self.stats_check.setToolTip("Stage times, cache counters and queue depths over the preview")
+        self.stats_check.toggled.connect(self.on_stats_toggled)
+        layout.addWidget(self.stats_check)
+
+        # 7 row
+        self.github_btn = QPushButton("GitHub Repository")
+        self.github_btn.clicked.connect(self.open_github)
+        layout.addWidget(self.github_btn)
+
+        layout.addStretch()
+        left_group.setLayout(layout)
+        return left_group
+
+    def create_right_panel(self):
+        # Creating group for right panel
+        right_group = QGroupBox("Preview")
+        layout = QVBoxLayout()
+
+        # Creating label for image
+        self.image_label = QLabel()
+        self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.image_label.setMinimumSize(400, 400)
+        self.image_label.setStyleSheet("border: 1px solid gray;")
+        self.image_label.setText("No Image/Video loaded")
+
+        # Stats overlay in the corner of the preview, hidden by default
+        self.stats_overlay = QLabel(self.image_label)
+        self.stats_overlay.setStyleSheet("background-color: rgba(0, 0, 0, 170); color: white; "
+                                         "font-family: monospace; font-size: 10px; padding: 4px;")
+        self.stats_overlay.move(8, 8)
+        self.stats_overlay.hide()
+
+        layout.addWidget(self.image_label)
+
+        buttons_row = QHBoxLayout()
+        self.export_one_btn = QPushButton("Export Current Image")
+        self.export_all_btn = QPushButton("Export All Images")
+        self.export_video_btn = QPushButton("Export Video")
+        self.back_btn = QPushButton("Back")
+        self.next_btn = QPushButton("Next")
+        self.next_save_btn = QPushButton("Next + Save")
+
+        self.export_one_btn.clicked.connect(self.export_one)
+        self.export_all_btn.clicked.connect(self.export_all)
+        self.export_video_btn.clicked.connect(self.export_video)
+        self.back_btn.clicked.connect(self.back)
+        self.next_btn.clicked.connect(self.next)
+        self.next_save_btn.clicked.connect(self.next_save)
+
+        buttons_row.addWidget(self.export_one_btn)
+        buttons_row.addWidget(self.export_all_btn)
+        buttons_row.addWidget(self.export_video_btn)
+        buttons_row.addWidget(self.back_btn)
+        buttons_row.addWidget(self.next_btn)
+        buttons_row.addWidget(self.next_save_btn)
+        layout.addLayout(buttons_row)
+
+        self.export_one_btn.setEnabled(False)
+        self.export_all_btn.setEnabled(False)
+        self.export_video_btn.setEnabled(False)
+        self.back_btn.setEnabled(False)
+        self.next_btn.setEnabled(False)
+        self.next_save_btn.setEnabled(False)
+
+        right_group.setLayout(layout)
+        return right_group
+
+    def _schedule_processing(self):
+        # Rendering is asynchronous, so only coalesce the changes that
+        # arrive within one pass of the event loop
+        self._processing_timer.start(0)
+
+    def _delayed_process_image(self):
+        self.process_image()
+
+    # Signals
+    def load_image(self, test=False):
+        """Load an image file and prepare for processing."""
+        self._get_image_file_path(test)
+        
+        if self.file_path and self.file_path != '':
+            self._prepare_for_image_mode()
+            self.process_image()
+    
+    def _get_image_file_path(self, test=False):
+        """Get the image file path from user or test mode."""
+        if test:
+            self.file_path = "test.jpg"
+            self.file_name = "test.jpg"
+        else:
+            result = QFileDialog.getOpenFileName(
+                self,
+                "Select Image",
+                "",
+                "Image Files (*.jpg *.jpeg *.png *.bmp)",
+                options=QFileDialog.Option.DontUseNativeDialog
+            )
+            self.file_path = result[0]
+            self.file_name = os.path.basename(self.file_path) if self.file_path else ""
+    
+    def _prepare_for_image_mode(self):
+        """Prepare the application for image processing mode."""
+        self.index = 0
+        self.is_video_loaded = False
+        self.video_loader.cleanup()
+        self._close_video_reader()
+        
+        self._cleanup_video_controls()
+        self._set_image_mode_buttons()
+    
+    def _cleanup_video_controls(self):
+        """Remove video-specific UI controls."""
+        if hasattr(self, 'video_slider'):
+            self.video_slider.deleteLater()
+        if hasattr(self, 'video_frame_info'):
+            self.video_frame_info.deleteLater()
+    
+    def _set_image_mode_buttons(self):
+        """Configure button states for image mode."""
+        self.back_btn.setEnabled(False)
+        self.next_btn.setEnabled(False)
+        self.next_save_btn.setEnabled(False)
+        self.export_all_btn.setEnabled(False)
+        self.export_video_btn.setEnabled(False)
+        self.export_one_btn.setEnabled(True)
+
+    def load_video(self):
+        """Load a video file and prepare for processing."""
+        self._get_video_file_path()
+        
+        if self.file_path and self.file_path != '':
+            self._prepare_for_video_mode()
+            self.load_video_file(self.file_path)
+    
+    def _get_video_file_path(self):
+        """Get the video file path from user selection."""
+        result = QFileDialog.getOpenFileName(
+            self,
+            "Select Video",
+            "",
+            "Video Files (*.mp4 *.avi *.mov *.mkv *.webm)",
+            options=QFileDialog.Option.DontUseNativeDialog
+        )
+        self.file_path = result[0]
+    
+    def _prepare_for_video_mode(self):
+        """Configure UI for video processing mode."""
+        self.back_btn.setEnabled(True)
+        self.next_btn.setEnabled(True)
+        self.next_save_btn.setEnabled(True)
+        self.export_all_btn.setEnabled(True)
+        self.export_video_btn.setEnabled(True)
+        self.export_one_btn.setEnabled(True)
+
+    def load_video_file(self, video_path):
+        progress = None
+        try:
+            # Showing progressbar
+            progress = QProgressDialog("Loading video...", "Cancel", 0, 100, self)
+            progress.setWindowModality(Qt.WindowModality.WindowModal)
+            progress.show()
+
+            # Clearing states
+            self.video_frames = []
+            self.current_frame_index = 0
+            self.is_video_loaded = True
+            self.image_processor.clear_cache()
+
+            # One capture stays open for frames the loader has not cached
+            self._close_video_reader()
+            self.video_reader = VideoReader(video_path)
+            if not self.video_reader.is_opened():
+                print("Error: Could not open video")
+                self._close_video_reader()
+                return
+
+            self.total_frames = self.video_reader.frame_count
+            self.fps = self.video_reader.fps
+
+            print(f"Video loaded: {self.total_frames} frames, {self.fps} FPS")
+
+            # Starting background loading frames
+            self.video_loader.start_loading(video_path)
+
+            self.setup_video_controls()
+
+            self.show_video_frame(0)
+
+        except Exception as e:
+            print(f"Error loading video: {e}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            if progress:
+                progress.close()
+
+    def setup_video_controls(self):
+        try:
+            if hasattr(self, 'video_slider') and self.video_slider is not None:
+                try:
+                    self.video_slider.deleteLater()
+                    self.video_slider = None
+                except RuntimeError:
+                    self.video_slider = None
+
+            if hasattr(self, 'video_frame_info') and self.video_frame_info is not None:
+                try:
+                    self.video_frame_info.deleteLater()
+                    self.video_frame_info = None
+                except RuntimeError:
+                    self.video_frame_info = None
+
+            self.video_slider = QSlider(Qt.Orientation.Horizontal)
+            self.video_slider.setMinimum(0)
+            self.video_slider.setMaximum(self.total_frames - 1)
+            self.video_slider.valueChanged.connect(self.on_video_slider_changed)
+
+            self.video_frame_info = QLabel(f"Frame: 1 / {self.total_frames}")
+            self.video_frame_info.setFixedHeight(20)
+
+            right_layout = self.image_label.parent().layout()
+            right_layout.addWidget(self.video_slider)
+            right_layout.addWidget(self.video_frame_info)
+        except Exception as e:
+            print(f"Error setting up video controls: {e}")
+
+    def show_video_frame(self, frame_index):
+        """Display a specific video frame with current processing settings."""
+        try:
+            self.video_loader.set_playhead(frame_index)
+            self._process_and_display_frame(
+                lambda: self._get_video_frame_image(frame_index),
+                ImageProcessor.source_key(self.file_path, frame_index)
+            )
+            self._update_frame_info(frame_index)
+            
+        except Exception as e:
+            print(f"Error showing video frame: {e}")
+            import traceback
+            traceback.print_exc()
+    
+    def _get_video_frame_image(self, frame_index):
+        """Get PIL image for the specified frame index, None if unreadable."""
+        cached_frame = self.video_loader.get_frame(frame_index)
+        
+        if cached_frame is not None:
+            return Image.fromarray(cached_frame)
+        
+        return self._load_frame_from_video(frame_index)
+    
+    def _load_frame_from_video(self, frame_index):
+        """Read a frame the loader has not cached from the open video."""
+        if self.video_reader is None:
+            return None
+        try:
+            frame_rgb = self.video_reader.read(frame_index)
+            if frame_rgb is None:
+                return None
+            self.video_loader.store(frame_index, frame_rgb)
+            return Image.fromarray(frame_rgb)
+        except Exception as e:
+            print(f"Error loading frame {frame_index}: {e}")
+            return None
+
+    def _close_video_reader(self):
+        if self.video_reader is not None:
+            self.video_reader.close()
+            self.video_reader = None
+    
+    def _current_settings(self):
+        return (self.size_slider.value(), self.threshold_slider.value() / 100.0,
+                self.dither_method, self.palette_method)
+
+    def _process_and_display_frame(self, pil_image, source):
+        """Show the cached result, or render it in the background."""
+        settings = self._current_settings()
+        result = self.image_processor.cached_result(source, *settings)
+        if result is not None:
+            self._render_worker.cancel()
+            self._show_result(result)
+            return
+
+        self._render_worker.submit(pil_image, *settings, source)
+
+    def _on_rendered(self, generation, result):
+        # Posts from superseded requests are not shown
+        if generation == self._render_worker.generation:
+            self._show_result(result)
+
+    def _show_result(self, result):
+        if result is None:
+            return
+        pixmap = self.image_processor.to_pixmap(result)
+        if pixmap.isNull():
+            return
+        self.current_pixmap = pixmap
+        self.scale_image()
+
+    def _exact_pixmap(self):
+        """Pixmap of the exact result for the current frame and settings.
+
+        The displayed pixmap may still be a preview; this renders on the
+        spot if the background render has not finished.
+        """
+        if self.is_video_loaded:
+            frame_index = self.current_frame_index
+            image = lambda: self._get_video_frame_image(frame_index)
+            source = ImageProcessor.source_key(self.file_path, frame_index)
+        else:
+            file_path = self.file_path
+            image = lambda: utils.open_image(file_path)
+            source = ImageProcessor.source_key(file_path)
+        return self.image_processor.process_frame(image, *self._current_settings(), source)
+    
+    def _update_frame_info(self, frame_index):
+        """Update the frame information display."""
+        if hasattr(self, 'video_frame_info'):
+            self.video_frame_info.setText(f"Frame: {frame_index + 1} / {self.total_frames}")
+
+    def process_image(self):
+        if not hasattr(self, 'file_path') or not self.file_path:
+            return
+
+        if self.is_video_loaded:
+            self.show_video_frame(self.current_frame_index)
+        else:
+            try:
+                file_path = self.file_path
+                self._process_and_display_frame(
+                    lambda: utils.open_image(file_path),
+                    ImageProcessor.source_key(file_path)
+                )
+            except Exception as e:
+                print(f"Error loading image: {e}")
+
+    def scale_image(self):
+        if hasattr(self, 'current_pixmap') and self.current_pixmap:
+            scaled_pixmap = self.current_pixmap.scaled(
+                self.image_label.width() - 20,
+                self.image_label.height() - 20,
+                Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.FastTransformation
+            )
+            self.image_label.setPixmap(scaled_pixmap)
+
+    def on_size_changed(self, value):
+        self.size_value_label.setText(str(value))
+        self._schedule_processing()
+
+    def on_threshold_changed(self, value):
+        self.threshold_value_label.setText(str(value))
+        self._schedule_processing()
+
+    def on_dither_changed(self, method):
+        self.dither_method = method
+        self._schedule_processing()
+
+    def on_palette_changed(self, value):
+        self.palette_method = value
+        self._schedule_processing()
+
+    def on_video_slider_changed(self, value):
+        self.current_frame_index = value
+        self.show_video_frame(value)
+
+    def on_stats_toggled(self, checked):
+        self._set_stats_enabled(checked or self._stats_always_on)
+        self.stats_overlay.setVisible(checked)
+        if checked:
+            self._update_stats_overlay()
+            self._stats_timer.start()
+        else:
+            self._stats_timer.stop()
+
+    def _update_stats_overlay(self):
+        lines = []
+        for stats in self._all_stats():
+            lines.extend(format_snapshot(stats.snapshot()))
+        self.stats_overlay.setText("\n".join(lines))
+        self.stats_overlay.adjustSize()
+        self.stats_overlay.raise_()
+
+    @staticmethod
+    def open_github():
+        github_url = "https://github.com/bezdarnosti-yt/YABM-generator"
+        webbrowser.open(github_url)
+
+    def next(self):
+        if self.current_frame_index < self.total_frames - 1:
+            self.on_video_slider_changed(self.current_frame_index + 1)
+
+    def back(self):
+        if self.current_frame_index > 0:
+            self.on_video_slider_changed(self.current_frame_index - 1)
+
+    def export_one(self):
+        if not hasattr(self, 'current_pixmap') or self.current_pixmap.isNull():
+            return
+
+        try:
+            base_name = os.path.splitext(os.path.basename(self.file_path))[0]
+            results_dir = f"{base_name}_results"
+            os.makedirs(results_dir, exist_ok=True)
+
+            if self.is_video_loaded:
+                filename = f"{results_dir}/result_{self.current_frame_index+1}.jpg"
+            else:
+                filename = f"{results_dir}/result_{self.index+1:04d}.jpg"
+
+            self._exact_pixmap().save(filename)
+            self.index += 1
+        except Exception as e:
+            print(f"Error exporting image: {e}")
+
+    def export_all(self):
+        """Export all video frames as individual images in the background."""
+        if not hasattr(self, 'current_pixmap') or self.current_pixmap.isNull():
+            return
+        if self._exporter is not None:
+            return
+
+        base_name = os.path.splitext(os.path.basename(self.file_path))[0]
+        self._start_export(ImageSequenceWriter(f"{base_name}_results"))
+
+    def export_video(self):
+        """Encode all dithered frames straight into a video or animation."""
+        if not hasattr(self, 'current_pixmap') or self.current_pixmap.isNull():
+            return
+        if self._exporter is not None:
+            return
+
+        base_name = os.path.splitext(os.path.basename(self.file_path))[0]
+        result = QFileDialog.getSaveFileName(
+            self,
+            "Export Video",
+            f"{base_name}_dithered.mkv",
+            "Lossless video (*.mkv *.avi *.mov);;Animated GIF (*.gif);;Animated PNG (*.png)",
+            options=QFileDialog.Option.DontUseNativeDialog
+        )
+        if not result[0]:
+            return
+
+        try:
+            writer = make_writer(result[0], self.fps)
+        except ValueError as e:
+            print(f"Error exporting video: {e}")
+            return
+        self._start_export(writer)
+
+    def _start_export(self, writer):
+        """Run a batch export into writer on a background thread."""
+        self._exporter = BatchExporter(
+            self.file_path, writer,
+            self.size_slider.value(), self.threshold_slider.value() / 100.0,
+            self.dither_method, self.palette_method,
+            progress_callback=self._export_signals.progress.emit,
+            temporal=self.temporal_check.isChecked()
+        )
+
+        self._export_progress = QProgressDialog("Exporting frames...", "Cancel", 0, self.total_frames, self)
+        self._export_progress.canceled.connect(self._exporter.cancel)
+        self._export_progress.show()
+        self.export_all_btn.setEnabled(False)
+        self.export_video_btn.setEnabled(False)
+
+        thread = threading.Thread(target=self._run_export, args=(self._exporter,), daemon=True)
+        thread.start()
+
+    def _run_export(self, exporter):
+        """Export thread body; reports back through signals only."""
+        written = 0
+        try:
+            written = exporter.run()
+        except Exception as e:
+            print(f"Error exporting frames: {e}")
+        self._export_signals.finished.emit(written)
+
+    def _on_export_progress(self, done, total):
+        if self._export_progress:
+            self._export_progress.setMaximum(total)
+            self._export_progress.setValue(done)
+
+    def _on_export_finished(self, written):
+        print(f"Exported {written} frames")
+        if self._export_progress:
+            self._export_progress.close()
+            self._export_progress = None
+        self._exporter = None
+        self.export_all_btn.setEnabled(self.is_video_loaded)
+        self.export_video_btn.setEnabled(self.is_video_loaded)
+
+
+    def next_save(self):
+        """Save current frame and move to next frame."""
+        if not hasattr(self, 'current_pixmap') or self.current_pixmap.isNull():
+            return
+
+        self._save_current_frame()
+        self.next()
+    
+    def _save_current_frame(self):
+        """Save the current frame to file."""
+        try:
+            base_name = os.path.splitext(os.path.basename(self.file_path))[0]
+            results_dir = f"{base_name}_results"
+            os.makedirs(results_dir, exist_ok=True)
+            
+            filename = f"{results_dir}/result_{self.current_frame_index+1}.jpg"
+            self._exact_pixmap().save(filename)
+        except Exception as e:
+            print(f"Error saving current frame: {e}")
+
+    def closeEvent(self, event):
+        """Clean up resources when closing the application."""
+        self._cleanup_resources()
+        event.accept()
+    
+    def _cleanup_resources(self):
+        """Clean up all resources and stop background threads."""
+        if self._exporter is not None:
+            self._exporter.cancel()
+        self._render_worker.stop()
+        if self._stats_dumper is not None:
+            self._stats_dumper.stop()
+            self._stats_dumper = None
+        self.video_loader.cleanup()
+        self.image_processor.clear_cache()
+        self._close_video_reader()
+
+def run():
+    """Show the main window until it is closed, returning the exit status."""
+    app = QApplication([])
+    window = MainWindow()
+    window.show()
+    return app.exec()
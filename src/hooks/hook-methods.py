@@ -0,0 +1,13 @@
+"""PyInstaller hook for methods.py.
+
+The registry imports method modules by name on first use, which the build
+cannot follow, so every registered module is listed here.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import methods
+
+hiddenimports = sorted({info.module for info in methods._registry.values()})
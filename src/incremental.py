@@ -0,0 +1,115 @@
+import numpy as np
+
+import jobs
+import methods
+import utils
+
+def dirty_tiles(changed, tile):
+    """Which tile x tile tiles of a frame hold at least one changed pixel."""
+    rows, cols = changed.shape
+    tile_rows, tile_cols = -(-rows // tile), -(-cols // tile)
+    padded = np.zeros((tile_rows * tile, tile_cols * tile), dtype=bool)
+    padded[:rows, :cols] = changed
+    return padded.reshape(tile_rows, tile, tile_cols, tile).any(axis=(1, 3))
+
+def tile_boxes(dirty, tile, rows, cols):
+    """(y0, y1, x0, x1) boxes covering the dirty tiles of a rows x cols frame.
+
+    Neighbouring dirty tiles of a tile row share a box, so they go through
+    the method at once.
+    """
+    boxes = []
+    for tile_row in np.flatnonzero(dirty.any(axis=1)):
+        tile_cols = np.flatnonzero(dirty[tile_row])
+        runs = np.split(tile_cols, np.flatnonzero(np.diff(tile_cols) > 1) + 1)
+        y0, y1 = tile_row * tile, min(rows, (tile_row + 1) * tile)
+        for run in runs:
+            boxes.append((y0, y1, run[0] * tile, min(cols, (run[-1] + 1) * tile)))
+    return boxes
+
+class IncrementalDitherer:
+    """Re-dithers only the parts of a video frame that changed.
+
+    Each frame is compared with the previous one in TILE_SIZE tiles.
+    Pointwise methods redo only the changed tiles, error diffusion rescans
+    from the first changed row and other methods redo the whole frame
+    unless nothing changed. The output always equals a full dither of the
+    frame. skipped_fraction is the share of pixels of the last frame that
+    did not need a new dither. Frames may be float or uint8 matrices.
+    """
+    # A multiple of every ordered map size, so tiles keep the pattern phase
+    TILE_SIZE = 64
+    # With more tiles changed than this, one pass over the frame is cheaper
+    MAX_TILE_FRACTION = 0.5
+
+    def __init__(self, threshold_value, dither_method, palette_method, seed=None):
+        self.settings = (threshold_value, dither_method, palette_method)
+        self.seed = seed
+        self.skipped_fraction = 0.0
+        self._scan = None
+        if methods.method_info(dither_method).category == 'error_diffusion':
+            import error_diffusion
+            self._scan = error_diffusion.DiffusionScan(dither_method, palette_method, threshold_value)
+        self.reset()
+
+    def reset(self):
+        """Forget the previous frame, e.g. after a seek."""
+        self._previous = None
+        self._output = None
+        if self._scan is not None:
+            self._scan.reset()
+
+    def _diffuse(self, image_matrix, first_row=0):
+        if image_matrix.dtype == np.uint8:
+            image_matrix = utils.uint8_to_float(image_matrix)
+        return self._scan.run(image_matrix, first_row)
+
+    def _dither_full(self, image_matrix):
+        if self._scan is not None:
+            return self._diffuse(image_matrix)
+        threshold_value, dither_method, palette_method = self.settings
+        return methods.dither_matrix(image_matrix, threshold_value, dither_method, palette_method, self.seed)
+
+    def _dither_tiles(self, image_matrix, dirty):
+        """Previous output with the dirty tiles dithered again, or None."""
+        if dirty.mean() > self.MAX_TILE_FRACTION:
+            return None
+        threshold_value, dither_method, palette_method = self.settings
+        rows, cols, _ = image_matrix.shape
+        output = self._output.copy()
+        redone = 0
+        for y0, y1, x0, x1 in tile_boxes(dirty, self.TILE_SIZE, rows, cols):
+            jobs.check_cancelled()
+            output[y0:y1, x0:x1] = methods.dither_matrix(
+                image_matrix[y0:y1, x0:x1], threshold_value, dither_method, palette_method)
+            redone += (y1 - y0) * (x1 - x0)
+        self.skipped_fraction = 1.0 - redone / float(rows * cols)
+        return output
+
+    def dither(self, image_matrix):
+        """Dithered float matrix for the next frame, as methods return it."""
+        previous, self._previous = self._previous, None
+        self.skipped_fraction = 0.0
+        if previous is None or previous.shape != image_matrix.shape or previous.dtype != image_matrix.dtype:
+            output = self._dither_full(image_matrix)
+        else:
+            changed = np.any(image_matrix != previous, axis=2)
+            dither_method = self.settings[1]
+            output = None
+            if not changed.any():
+                self.skipped_fraction = 1.0
+                output = self._output
+            elif dither_method in methods.pointwise_methods:
+                output = self._dither_tiles(image_matrix, dirty_tiles(changed, self.TILE_SIZE))
+            elif self._scan is not None:
+                # Rows above the first change are scanned exactly as before
+                first_row = int(np.argmax(changed.any(axis=1)))
+                output = self._diffuse(image_matrix, first_row)
+                self.skipped_fraction = first_row / float(image_matrix.shape[0])
+            if output is None:
+                output = self._dither_full(image_matrix)
+
+        # Kept only once the frame finished, a cancelled one forces a full pass
+        self._previous = image_matrix.copy()
+        self._output = output
+        return output.copy()
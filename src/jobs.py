@@ -0,0 +1,38 @@
+import threading
+from contextlib import contextmanager
+
+class Cancelled(Exception):
+    """Raised inside a job whose result is no longer wanted."""
+
+class CancelToken:
+    """Cancellation flag shared between a job and whoever started it."""
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+_local = threading.local()
+
+@contextmanager
+def running(token):
+    """Make token the current thread's token while the block runs."""
+    previous = getattr(_local, 'token', None)
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous
+
+def check_cancelled():
+    """Raise Cancelled if the current thread's job was cancelled.
+
+    Long loops call this between steps; outside a job it does nothing.
+    """
+    token = getattr(_local, 'token', None)
+    if token is not None and token.cancelled:
+        raise Cancelled()
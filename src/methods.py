@@ -0,0 +1,167 @@
+import importlib
+import math
+from collections import OrderedDict, namedtuple
+from collections.abc import Mapping
+
+import numpy as np
+from PIL import Image
+
+import utils
+
+# What the rest of the program needs to know about a method without loading it.
+# module holds the method in its available_methods and, with batch, the uint8
+# path in its uint8_methods. cost is 'fast' for per-pixel methods and 'slow'
+# for those scanning the image in order. batch methods have a uint8 path that
+# also takes stacks of frames. tiling methods give a pixel an output that
+# depends only on its input and its position in the pattern, so a tile aligned
+# to the pattern dithers as in the whole image. seeded methods take a seed.
+# raster methods work through the image in row order, so the first rows of a
+# frame dither as they do in the whole frame.
+MethodInfo = namedtuple('MethodInfo', ['name', 'module', 'category', 'cost', 'batch', 'tiling', 'seeded',
+                                       'raster'])
+
+_registry = OrderedDict()
+
+def register_method(name, module, category, cost='fast', batch=False, tiling=False, seeded=False,
+                    raster=False):
+    """Add a dither method by the name of its module, imported on first use."""
+    if name in _registry:
+        raise ValueError(f"Dither method already exists: {name}")
+    _registry[name] = MethodInfo(name, module, category, cost, batch, tiling, seeded, raster)
+
+def method_info(name):
+    """MethodInfo of a registered method, without importing its module."""
+    return _registry[name]
+
+class _MethodTable(Mapping):
+    """Registered methods matching a condition, in registration order.
+
+    Names and membership come from the registry; the method's module is
+    imported only when a method is looked up.
+    """
+    def __init__(self, attribute, condition=None):
+        self.attribute = attribute
+        self.condition = condition or (lambda info: True)
+
+    def __contains__(self, name):
+        info = _registry.get(name)
+        return info is not None and self.condition(info)
+
+    def __getitem__(self, name):
+        if name not in self:
+            raise KeyError(name)
+        module = importlib.import_module(_registry[name].module)
+        return getattr(module, self.attribute)[name]
+
+    def __iter__(self):
+        return (name for name, info in _registry.items() if self.condition(info))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+# hooks/hook-methods.py hands these modules to PyInstaller, which cannot see
+# imports by name
+register_method('threshold', 'threshold', 'threshold', batch=True, tiling=True)
+# Noise is drawn row by row; block_random sizes its blocks from the whole frame
+register_method('random', 'randomized', 'randomized', seeded=True, raster=True)
+register_method('block_random', 'randomized', 'randomized', seeded=True)
+for name in ['bayer4x4', 'bayer8x8', 'cluster4x4', 'cluster8x8']:
+    register_method(name, 'ordered_dithering', 'ordered', batch=True, tiling=True)
+for name in ['floyd_steinberg', 'atkinson', 'burkes', 'sierra_lite']:
+    register_method(name, 'error_diffusion', 'error_diffusion', cost='slow', raster=True)
+
+available_methods = _MethodTable('available_methods')
+
+# uint8 paths returning palette indices, identical to the float methods
+uint8_methods = _MethodTable('uint8_methods', lambda info: info.batch)
+
+# Methods that take a seed for their noise
+seeded_methods = _MethodTable('available_methods', lambda info: info.seeded).keys()
+
+# Fast enough to preview with the method itself, the rest preview as bayer4x4
+preview_methods = _MethodTable('available_methods', lambda info: info.cost == 'fast').keys()
+PREVIEW_FALLBACK_METHOD = 'bayer4x4'
+
+# Tiles aligned to the pattern can be dithered on their own
+pointwise_methods = _MethodTable('available_methods', lambda info: info.tiling).keys()
+
+# Preview size; keeps a preview dither within a few milliseconds
+PREVIEW_MAX_PIXELS = 160 * 120
+
+def scaled_size(image, scale_percent):
+    scale_factor = scale_percent / 100.0
+    return max(1, int(image.width * scale_factor)), max(1, int(image.height * scale_factor))
+
+def resize_image(image, scale_percent):
+    """Scale a PIL image by percent the same way the preview does."""
+    return image.resize(scaled_size(image, scale_percent), Image.Resampling.NEAREST)
+
+def dither_matrix(image_matrix, threshold_value, dither_method, palette_method, seed=None):
+    """Run a method on a prepared matrix; seed fixes the noise of seeded methods.
+
+    A uint8 matrix takes the uint8 path when the method has one and is
+    converted to float otherwise; the result is the same float matrix.
+    """
+    if image_matrix.dtype == np.uint8:
+        if dither_method in uint8_methods:
+            indices = uint8_methods[dither_method](image_matrix, palette_method, threshold_value)
+            return utils._palette_cache.get_palette_array(palette_method)[indices]
+        image_matrix = utils.uint8_to_float(image_matrix)
+    method = available_methods[dither_method]
+    if dither_method in seeded_methods:
+        return method(image_matrix, palette_method, threshold_value, seed=seed)
+    return method(image_matrix, palette_method, threshold_value)
+
+def dither_image(image, scale_percent, threshold_value, dither_method, palette_method, seed=None):
+    """Resize and dither a PIL image, returning the result as a PIL image."""
+    if dither_method in uint8_methods:
+        indices = matrix_indices(prepare_pixels(image, scale_percent), threshold_value, dither_method, palette_method)
+        return Image.fromarray(utils.palette_colors_uint8(palette_method)[indices])
+    image_matrix = prepare_matrix(image, scale_percent)
+    return utils.numpy2pil(dither_matrix(image_matrix, threshold_value, dither_method, palette_method, seed))
+
+def prepare_matrix(image, scale_percent):
+    """Resized float matrix of a PIL image, the input every method takes."""
+    return utils.pil2numpy(resize_image(image, scale_percent))
+
+def prepare_pixels(image, scale_percent):
+    """Resized uint8 RGB array of a PIL image; a quarter of prepare_matrix's size."""
+    return np.asarray(resize_image(image, scale_percent))
+
+def matrix_indices(image_matrix, threshold_value, dither_method, palette_method):
+    """Dither a prepared float or uint8 matrix, returning its (H, W) palette indices."""
+    if image_matrix.dtype == np.uint8 and dither_method in uint8_methods:
+        return uint8_methods[dither_method](image_matrix, palette_method, threshold_value)
+    result = dither_matrix(image_matrix, threshold_value, dither_method, palette_method)
+    # Every output pixel is a palette color, so the lookup maps it back exactly
+    return utils.palette_indices(result, palette_method)
+
+def batch_indices(frames, threshold_value, dither_method, palette_method):
+    """Palette indices of an (N, H, W, 3) stack of frames, shape (N, H, W).
+
+    uint8 frames of methods in uint8_methods go through in one pass that
+    builds the method's tables once; others are dithered frame by frame.
+    """
+    frames = np.asarray(frames)
+    if frames.dtype == np.uint8 and dither_method in uint8_methods:
+        return uint8_methods[dither_method](frames, palette_method, threshold_value)
+    return np.stack([matrix_indices(frame, threshold_value, dither_method, palette_method)
+                     for frame in frames])
+
+def preview_indices(image, scale_percent, threshold_value, dither_method, palette_method,
+                    max_pixels=PREVIEW_MAX_PIXELS):
+    """Quick approximation of the dithered image at most max_pixels large.
+
+    Slow methods are approximated with PREVIEW_FALLBACK_METHOD. Returns None
+    when the image is small enough that the exact result is as cheap.
+    """
+    width, height = scaled_size(image, scale_percent)
+    if width * height <= max_pixels:
+        return None
+    shrink = math.sqrt(width * height / max_pixels)
+    size = (max(1, int(width / shrink)), max(1, int(height / shrink)))
+    image_matrix = np.asarray(image.resize(size, Image.Resampling.NEAREST))
+
+    if dither_method not in preview_methods:
+        dither_method = PREVIEW_FALLBACK_METHOD
+    return matrix_indices(image_matrix, threshold_value, dither_method, palette_method)
@@ -2,6 +2,7 @@ from collections import OrderedDict
 import numpy as np
 
 import utils
+from result_cache import ResultCache
 
 _diffusion_matrices = {
     'bayer4x4': np.array([
@@ -38,30 +39,78 @@ _diffusion_matrices = {
     ], dtype=np.float32),
 }
 
-def _ordered_dither(image_matrix, palette_name, map_to_use, threshold=0.5):
-    rows, cols, depth = image_matrix.shape
-    map_size = map_to_use.shape[0]
+# Map values lie in 0..1 and the threshold shifts them by at most 0.25,
+# so noisy pixels stay in this range and the palette LUT is built over it
+NOISY_BOUNDS = (-0.25, 2.25)
 
-    # Creating noise matrix
-    threshold_adjustment = (threshold - 0.5) * 0.5
+# Tiled planes depend only on the map, the frame size and the threshold,
+# so during playback every frame reuses the same ones
+PLANE_CACHE_BYTES = 64 * 1024 * 1024
+_planes = ResultCache(PLANE_CACHE_BYTES)
 
-    # Creating index matrix
+def _tile_indices(map_size, rows, cols):
     x_indices = np.arange(cols) % map_size
     y_indices = np.arange(rows) % map_size
+    return y_indices[:, np.newaxis], x_indices[np.newaxis, :]
+
+def _threshold_plane(map_to_use, rows, cols, threshold):
+    """Adjusted map value of every pixel, shape (rows, cols, 1), read-only."""
+    key = ('plane', map_to_use.tobytes(), rows, cols, threshold)
+    plane = _planes.get(key)
+    if plane is None:
+        # Creating noise matrix
+        threshold_adjustment = (threshold - 0.5) * 0.5
+
+        # Getting value of dither map for every pixel
+        y_indices, x_indices = _tile_indices(map_to_use.shape[0], rows, cols)
+        adjusted_map_values = map_to_use[y_indices, x_indices] + threshold_adjustment
 
-    # Getting value of dither map for every pixel
-    adjusted_map_values = map_to_use[y_indices[:, np.newaxis], x_indices[np.newaxis, :]]
-    adjusted_map_values = adjusted_map_values + threshold_adjustment
+        # Expand for 3 color channels
+        plane = adjusted_map_values[:, :, np.newaxis]
+        plane.flags.writeable = False
+        _planes.put(key, plane)
+    return plane
+
+def _map_offsets(map_size, rows, cols):
+    """Value table row of every pixel for the uint8 path, (rows, cols), read-only."""
+    key = ('offsets', map_size, rows, cols)
+    offsets = _planes.get(key)
+    if offsets is None:
+        y_indices, x_indices = _tile_indices(map_size, rows, cols)
+        offsets = ((y_indices * map_size + x_indices) * 256).astype(np.int32)
+        offsets.flags.writeable = False
+        _planes.put(key, offsets)
+    return offsets
+
+def _ordered_dither(image_matrix, palette_name, map_to_use, threshold=0.5):
+    rows, cols, depth = image_matrix.shape
 
-    # Expand for 3 color channels and apply noise
-    adjusted_map_values_3d = adjusted_map_values[:, :, np.newaxis]
-    noisy_image = image_matrix + adjusted_map_values_3d
+    # Apply noise
+    noisy_image = image_matrix + _threshold_plane(map_to_use, rows, cols, threshold)
 
     # Apply palette for image
-    new_matrix = utils.closest_palette_color(noisy_image, palette_name)
+    new_matrix = utils.quantize(noisy_image, palette_name, bounds=NOISY_BOUNDS)
 
     return new_matrix
 
+def _ordered_indices_uint8(pixels, palette_name, map_to_use, threshold=0.5):
+    """Palette indices of uint8 RGB pixels, the same _ordered_dither gives.
+
+    A pixel value plus a map value has only 256 * map_size**2 outcomes, so
+    they are computed once in float as the float path does and each pixel
+    becomes an index into that table. pixels may also be an (N, H, W, 3)
+    stack of frames, which share the tables and the map offsets.
+    """
+    rows, cols, depth = pixels.shape[-3:]
+    map_size = map_to_use.shape[0]
+
+    adjusted_map_values = map_to_use + (threshold - 0.5) * 0.5
+    noisy_values = utils.UINT8_LEVELS[np.newaxis, :] + adjusted_map_values.reshape(-1, 1)
+
+    # Table row of every pixel's map value
+    offsets = _map_offsets(map_size, rows, cols)
+    return utils.table_palette_indices(noisy_values.reshape(-1), pixels, offsets, palette_name, NOISY_BOUNDS)
+
 _method_names = [
         'bayer4x4', 'bayer8x8',
         'cluster4x4', 'cluster8x8',
@@ -73,6 +122,16 @@ def _create_method(matrix_name):
         return _ordered_dither(image_matrix, palette_name, _diffusion_matrices[matrix_name], threshold)
     return method
 
+def _create_uint8_method(matrix_name):
+    """Create the uint8 path of an ordered dithering method."""
+    def method(pixels, palette_name, threshold=0.5):
+        return _ordered_indices_uint8(pixels, palette_name, _diffusion_matrices[matrix_name], threshold)
+    return method
+
 available_methods = OrderedDict(
     (name, _create_method(name)) for name in _method_names
 )
+
+uint8_methods = OrderedDict(
+    (name, _create_uint8_method(name)) for name in _method_names
+)
@@ -1,5 +1,6 @@
 from collections import OrderedDict
 import json, os
+import threading
 
 class PaletteManager:
     def __init__(self):
@@ -125,7 +126,32 @@ class PaletteManager:
 
         self.palettes['ega_default'] = low + high
 
-# Create global instance for backward compatibility
-_palette_manager = PaletteManager()
-palettes = _palette_manager.palettes
-available_palettes = _palette_manager.available_palettes
+    def add_palette(self, name, colors):
+        """Register a custom palette of [r, g, b] colors in 0..1 (not written to the cache)."""
+        if name in self.palettes:
+            raise ValueError(f"Palette already exists: {name}")
+        if not colors or any(len(color) != 3 for color in colors):
+            raise ValueError(f"Palette {name} must be a non-empty list of [r, g, b] colors")
+        self.palettes[name] = [[float(c) for c in color] for color in colors]
+        self.available_palettes.append(name)
+
+# Global instance, built or read from the cache on first use rather than on import
+_palette_manager = None
+_palette_manager_lock = threading.Lock()
+
+def _manager():
+    global _palette_manager
+    if _palette_manager is None:
+        with _palette_manager_lock:
+            if _palette_manager is None:
+                _palette_manager = PaletteManager()
+    return _palette_manager
+
+def add_palette(name, colors):
+    _manager().add_palette(name, colors)
+
+def __getattr__(name):
+    # palette.palettes and palette.available_palettes, as before
+    if name in ('palettes', 'available_palettes'):
+        return getattr(_manager(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,180 @@
+import numpy as np
+
+import jobs
+
+# Palettes with more colors than this get a PaletteGridIndex
+INDEX_MIN_PALETTE_SIZE = 128
+
+# Default upper bound for distance temporaries, in bytes
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+def _tile_length(row_size, itemsize, max_bytes):
+    """Pixels per tile so the (tile, row_size) temporaries stay under max_bytes."""
+    # Distance accumulator plus one channel term and its square
+    return max(1, int(max_bytes // (3 * row_size * itemsize)))
+
+def brute_force_indices(pixels, palette_array, max_bytes=DEFAULT_MAX_BYTES):
+    """Exact nearest palette index for an (N, 3) array of pixels.
+
+    Pixels are processed in tiles sized by _tile_length. Squared distances
+    are enough for argmin, so no sqrt is taken.
+    """
+    itemsize = np.result_type(pixels.dtype, palette_array.dtype).itemsize
+    tile = _tile_length(len(palette_array), itemsize, max_bytes)
+
+    result = np.empty(len(pixels), dtype=np.intp)
+    for start in range(0, len(pixels), tile):
+        jobs.check_cancelled()
+        block = pixels[start:start + tile]
+        distances = (block[:, 0, np.newaxis] - palette_array[np.newaxis, :, 0]) ** 2
+        distances += (block[:, 1, np.newaxis] - palette_array[np.newaxis, :, 1]) ** 2
+        distances += (block[:, 2, np.newaxis] - palette_array[np.newaxis, :, 2]) ** 2
+        np.argmin(distances, axis=1, out=result[start:start + tile])
+    return result
+
+class PaletteGridIndex:
+    """Uniform grid over RGB with per-cell nearest color candidate lists.
+
+    A palette color is a candidate of a cell unless its minimum distance to
+    the cell is larger than the maximum distance of some other color, so
+    searching only the candidates gives the same answer as brute force.
+    The grid spans the palette and the channel range bounds.
+
+    Candidate lists are kept at their own length, so a dense cell only
+    slows down the pixels that fall into it. Cells with so many candidates
+    that gathering them costs more than comparing every color use brute
+    force.
+    """
+    # Slack for float rounding when cutting candidates and mapping cells
+    _EPSILON = 1e-6
+
+    # Cost of one gathered candidate relative to one brute force color
+    _GATHER_COST = 4
+
+    # Padding, in candidates, always worth more than the overhead of
+    # splitting a query by list length
+    _MIN_PADDING = 1 << 14
+
+    def __init__(self, palette_array, cells=None, bounds=(0.0, 1.0)):
+        self.palette_array = palette_array
+        palette_size = len(palette_array)
+        colors = palette_array.astype(np.float64)
+        self.low = np.minimum(colors.min(axis=0), bounds[0])
+        self.high = np.maximum(colors.max(axis=0), bounds[1])
+
+        if cells is None:
+            # Roughly one color per eight cells of the unit cube, more
+            # for wider bounds; build time grows with cells**3 * palette size
+            extent = float(np.max(self.high - self.low))
+            cells = int(np.clip(np.ceil(2 * extent * palette_size ** (1.0 / 3.0)), 2, 32))
+        self.cells = cells
+        self.scale = cells / (self.high - self.low)
+
+        # Both distances split into per-axis terms: (cells, palette) tables
+        # of the nearest and farthest squared offset to each cell slab,
+        # slabs slightly widened to absorb rounding in cell mapping
+        near = []
+        far = []
+        for c in range(3):
+            edges = np.linspace(self.low[c], self.high[c], cells + 1)
+            slab_low = edges[:-1, np.newaxis] - self._EPSILON
+            slab_high = edges[1:, np.newaxis] + self._EPSILON
+            values = colors[np.newaxis, :, c]
+            near.append(np.maximum(np.maximum(slab_low - values, values - slab_high), 0.0) ** 2)
+            far.append(np.maximum(np.abs(values - slab_low), np.abs(values - slab_high)) ** 2)
+
+        near_gb = (near[1][:, np.newaxis, :] + near[2][np.newaxis, :, :]).reshape(-1, palette_size)
+        far_gb = (far[1][:, np.newaxis, :] + far[2][np.newaxis, :, :]).reshape(-1, palette_size)
+
+        candidate_lists = []
+        for r in range(cells):
+            min_dist = near[0][r] + near_gb
+            max_dist = far[0][r] + far_gb
+            bound = max_dist.min(axis=1, keepdims=True) * (1 + self._EPSILON) + self._EPSILON
+            for keep in min_dist <= bound:
+                candidate_lists.append(np.flatnonzero(keep))
+
+        # Lists stored back to back, cell i owns counts[i] entries from starts[i]
+        self.counts = np.array([len(c) for c in candidate_lists], dtype=np.intp)
+        self.starts = np.concatenate([[0], np.cumsum(self.counts)[:-1]])
+        self.candidate_list = np.concatenate(candidate_lists)
+        self.max_candidates = int(self.counts.max())
+        # Cells whose candidates cost more to gather than comparing every color
+        self.brute_force_cells = self.counts * self._GATHER_COST >= palette_size
+
+    def _search(self, pixels, cell, counts, max_bytes):
+        """Nearest candidate of every pixel among the counts candidates of its cell."""
+        palette_array = self.palette_array
+        itemsize = np.result_type(pixels.dtype, palette_array.dtype).itemsize
+
+        # Candidate colors are gathered too, hence the extra row width
+        tile = _tile_length(4 * int(counts.max()), itemsize, max_bytes)
+        result = np.empty(len(pixels), dtype=np.intp)
+        for start in range(0, len(pixels), tile):
+            jobs.check_cancelled()
+            block = pixels[start:start + tile]
+            block_counts = counts[start:start + tile]
+            # Shorter lists repeat their last entry; argmin keeps the earlier index
+            offsets = np.minimum(np.arange(block_counts.max()), block_counts[:, np.newaxis] - 1)
+            candidates = self.candidate_list[self.starts[cell[start:start + tile], np.newaxis] + offsets]
+            colors = palette_array[candidates]
+            distances = (block[:, np.newaxis, 0] - colors[:, :, 0]) ** 2
+            distances += (block[:, np.newaxis, 1] - colors[:, :, 1]) ** 2
+            distances += (block[:, np.newaxis, 2] - colors[:, :, 2]) ** 2
+            best = np.argmin(distances, axis=1)
+            result[start:start + tile] = candidates[np.arange(len(block)), best]
+        return result
+
+    def query(self, pixels, max_bytes=DEFAULT_MAX_BYTES):
+        """Nearest palette index for an (N, 3) array of pixels.
+
+        Only the candidates of each pixel's cell are compared, in tiles
+        bounded by max_bytes. Pixels outside the grid or in cells marked
+        for brute force compare every color.
+        """
+        palette_array = self.palette_array
+        position = (pixels - self.low) * self.scale
+        inside = np.all((position >= 0) & (position <= self.cells), axis=1)
+        if not inside.all():
+            result = brute_force_indices(pixels[~inside], palette_array, max_bytes)
+            full = np.empty(len(pixels), dtype=np.intp)
+            full[~inside] = result
+            full[inside] = self.query(pixels[inside], max_bytes)
+            return full
+
+        cell = np.minimum(position.astype(np.intp), self.cells - 1)
+        cell = (cell[:, 0] * self.cells + cell[:, 1]) * self.cells + cell[:, 2]
+        if len(cell) == 0:
+            return np.empty(0, dtype=np.intp)
+
+        # Padding every list to the longest one is fine while the padding
+        # costs less than a pass per length would; otherwise lists go by
+        # power-of-two length
+        counts = self.counts[cell]
+        brute_force = self.brute_force_cells[cell]
+        used = counts.sum()
+        if not brute_force.any() and counts.max() * len(counts) - used <= max(used, self._MIN_PADDING):
+            return self._search(pixels, cell, counts, max_bytes)
+
+        groups = np.ceil(np.log2(counts)).astype(np.intp)
+        groups[brute_force] = -1
+        result = np.empty(len(pixels), dtype=np.intp)
+        for group in np.unique(groups):
+            chosen = np.flatnonzero(groups == group)
+            if group < 0:
+                result[chosen] = brute_force_indices(pixels[chosen], palette_array, max_bytes)
+            else:
+                result[chosen] = self._search(pixels[chosen], cell[chosen], counts[chosen], max_bytes)
+        return result
+
+def closest_indices(pixels, palette_array, max_bytes=DEFAULT_MAX_BYTES, index=None):
+    """Nearest palette index per pixel, through the grid index when given one."""
+    if index is not None:
+        return index.query(pixels, max_bytes)
+    return brute_force_indices(pixels, palette_array, max_bytes)
+
+def build_palette_index(palette_array, bounds=(0.0, 1.0)):
+    """PaletteGridIndex for large palettes, None when brute force is cheaper."""
+    if len(palette_array) <= INDEX_MIN_PALETTE_SIZE:
+        return None
+    return PaletteGridIndex(palette_array, bounds=bounds)
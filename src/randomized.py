@@ -1,68 +1,53 @@
 from collections import OrderedDict
 import numpy as np
-import random
 
 import utils
 
-def randomized(image_matrix, palette_name, threshold_val=0.5):
-    new_matrix = np.copy(image_matrix)
-    rows, cols, depth = image_matrix.shape
-
+def _noise_strength(threshold_val):
     # Threshold affects noise strength
-    noise_strength = 1.0 / 6.0 * (0.5 + threshold_val)
+    return 1.0 / 6.0 * (0.5 + threshold_val)
+
+def randomized(image_matrix, palette_name, threshold_val=0.5, seed=None):
+    """Gaussian noise per pixel and channel, then one palette pass.
 
-    for y in range(rows):
-        for x in range(cols):
-            old_pixel = new_matrix[y, x]
-            opr, opg, opb = old_pixel
+    seed is anything numpy.random.default_rng takes; the same seed gives
+    the same result.
+    """
+    rng = np.random.default_rng(seed)
+    noise = rng.normal(0.0, _noise_strength(threshold_val), size=image_matrix.shape).astype(np.float32)
 
-            opr = utils.clamp(opr + random.gauss(0.0, noise_strength))
-            opg = utils.clamp(opg + random.gauss(0.0, noise_strength))
-            opb = utils.clamp(opb + random.gauss(0.0, noise_strength))
+    new_matrix = image_matrix + noise
+    np.clip(new_matrix, 0.0, 1.0, out=new_matrix)
 
-            new_pixel = np.array(utils.closest_palette_color([opr, opg, opb], palette_name), dtype=float)
-            new_matrix[y, x] = new_pixel
-    return new_matrix
+    # Quantize all noisy pixels at once
+    return utils.quantize(new_matrix, palette_name)
 
-def block_randomized(image_matrix, palette_name, threshold_val=0.5):
-    new_matrix = np.copy(image_matrix)
+def block_randomized(image_matrix, palette_name, threshold_val=0.5, seed=None):
+    """One noisy palette color per block of roughly 1/50 of the image."""
+    rng = np.random.default_rng(seed)
     rows, cols, depth = image_matrix.shape
 
     # Block sizes
     block_width, block_height = max(1, cols // 50), max(1, rows // 50)
+    block_rows = np.arange(0, rows, block_height)
+    block_cols = np.arange(0, cols, block_width)
 
-    # Threshold affects noise strength
-    noise_strength = 1.0 / 6.0 * (0.5 + threshold_val)
-
-    for by in range(0, rows, block_height):
-        for bx in range(0, cols, block_width):
-            # Determ real block end
-            end_x = min(bx + block_width, cols)
-            end_y = min(by + block_height, rows)
-            actual_block_width = end_x - bx
-            actual_block_height = end_y - by
-
-            if actual_block_width == 0 or actual_block_height == 0:
-                continue
-
-            # Calculate average block color
-            block = new_matrix[by:end_y, bx:end_x, :]
-            avg_color = np.mean(block, axis=(0, 1))
-
-            # Generate one noise for all blocks
-            ar = np.clip(avg_color[0] + random.gauss(0.0, noise_strength), 0.0, 1.0)
-            ag = np.clip(avg_color[1] + random.gauss(0.0, noise_strength), 0.0, 1.0)
-            ab = np.clip(avg_color[2] + random.gauss(0.0, noise_strength), 0.0, 1.0)
-
-            # Getting palette color for block
-            block_color = utils.closest_palette_color([ar, ag, ab], palette_name)
+    # Calculate average block colors, edge blocks may be smaller
+    sums = np.add.reduceat(np.add.reduceat(image_matrix, block_rows, axis=0), block_cols, axis=1)
+    heights = np.diff(np.append(block_rows, rows))
+    widths = np.diff(np.append(block_cols, cols))
+    avg_colors = sums / (heights[:, np.newaxis, np.newaxis] * widths[np.newaxis, :, np.newaxis])
 
-            # Filling block with this color
-            new_matrix[by:end_y, bx:end_x] = block_color
+    # Generate one noise for every block
+    noise = rng.normal(0.0, _noise_strength(threshold_val), size=avg_colors.shape)
+    block_colors = utils.quantize(np.clip(avg_colors + noise, 0.0, 1.0).astype(np.float32), palette_name)
 
-    return new_matrix
+    # Filling blocks with their colors
+    y_blocks = np.arange(rows) // block_height
+    x_blocks = np.arange(cols) // block_width
+    return block_colors[y_blocks[:, np.newaxis], x_blocks[np.newaxis, :]]
 
 available_methods = OrderedDict([
-    ('random', lambda im, pal, threshold=0.5: randomized(im, pal, threshold)),
-    ('block_random', lambda im, pal, threshold=0.5: block_randomized(im, pal, threshold)),
+    ('random', lambda im, pal, threshold=0.5, seed=None: randomized(im, pal, threshold, seed)),
+    ('block_random', lambda im, pal, threshold=0.5, seed=None: block_randomized(im, pal, threshold, seed)),
 ])
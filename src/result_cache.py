@@ -0,0 +1,121 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import utils
+
+class DitherResult:
+    """A dithered image stored as palette indices.
+
+    Two-color results are bit-packed, one bit per pixel, most significant
+    bit first and each row starting on a byte. Up to 256 colors take a
+    byte per pixel, larger palettes two.
+    """
+    def __init__(self, indices, palette_name):
+        self.palette_name = palette_name
+        self.height, self.width = indices.shape
+        palette_size = len(utils._palette_cache.get_palette_array(palette_name))
+        if palette_size <= 2:
+            self.bits = 1
+            self.data = np.packbits(indices.astype(np.uint8), axis=1)
+        elif palette_size <= 256:
+            self.bits = 8
+            self.data = indices.astype(np.uint8)
+        else:
+            self.bits = 16
+            self.data = indices.astype(np.uint16)
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def indices(self):
+        """Palette index of every pixel, shape (height, width)."""
+        if self.bits == 1:
+            return np.unpackbits(self.data, axis=1, count=self.width)
+        return self.data
+
+    def to_rgb(self):
+        """uint8 RGB image, the same bytes utils.numpy2pil gives for the colors."""
+        return utils.palette_colors_uint8(self.palette_name)[self.indices()]
+
+    def to_qimage(self):
+        """QImage reading the stored indices in place, with the palette as color table.
+
+        1-bit data already is Format_Mono and bytes are Format_Indexed8, so
+        no pixel is copied. The QImage holds a reference to the buffer for
+        as long as it lives. Larger palettes have no indexed format and go
+        through to_rgb().
+        """
+        # Qt is imported here so headless users of the cache never load it
+        from PyQt6.QtGui import QImage
+
+        if self.bits == 16:
+            data = np.ascontiguousarray(self.to_rgb())
+            q_image = QImage(data, self.width, self.height, self.width * 3, QImage.Format.Format_RGB888)
+        else:
+            data = self.data
+            image_format = QImage.Format.Format_Mono if self.bits == 1 else QImage.Format.Format_Indexed8
+            q_image = QImage(data, self.width, self.height, data.strides[0], image_format)
+            colors = utils.palette_colors_uint8(self.palette_name).astype(np.uint32)
+            q_image.setColorTable([int(color) for color in
+                                   0xFF000000 | colors[:, 0] << 16 | colors[:, 1] << 8 | colors[:, 2]])
+        q_image._buffer = data
+        return q_image
+
+def _nbytes(value):
+    return value.nbytes
+
+class ResultCache:
+    """LRU cache bounded by the total size of its entries in bytes.
+
+    Entries are measured with sizeof, by default their nbytes attribute.
+    hits, misses and evictions count lookups and dropped entries.
+    """
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, sizeof=_nbytes):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return result
+
+    def put(self, key, result):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self.sizeof(self._entries.pop(key))
+            self._entries[key] = result
+            self._bytes += self.sizeof(result)
+
+            # Keep the newest entry even when it alone exceeds the budget
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, oldest = self._entries.popitem(last=False)
+                self._bytes -= self.sizeof(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
@@ -0,0 +1,160 @@
+import csv
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+class _Disabled:
+    """Context manager that does nothing, handed out while stats are off."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_DISABLED = _Disabled()
+
+class _Stage:
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+class Stats:
+    """Per-stage timers, counters and watched values of one component.
+
+    Nothing is collected until enabled: stage() then hands out a shared
+    no-op context manager and count() returns at once, so the hooks cost
+    about an attribute check. Watched values are functions only called by
+    snapshot(), e.g. for queue depths.
+    """
+    def __init__(self, name, enabled=False):
+        self.name = name
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._watches = OrderedDict()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            # name -> [count, total, max, last] in seconds
+            self._timers = OrderedDict()
+            self._counters = OrderedDict()
+
+    def stage(self, name):
+        """Context manager timing one run of a stage."""
+        if not self.enabled:
+            return _DISABLED
+        return _Stage(self, name)
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            timer = self._timers.get(name)
+            if timer is None:
+                timer = self._timers[name] = [0, 0.0, 0.0, 0.0]
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+            timer[3] = seconds
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def watch(self, name, function):
+        """Report function() as name in every snapshot."""
+        self._watches[name] = function
+
+    def snapshot(self):
+        """Current values as a JSON-ready dict, times in milliseconds."""
+        with self._lock:
+            timers = OrderedDict(
+                (name, {'count': count, 'total_ms': total * 1e3, 'mean_ms': total * 1e3 / count,
+                        'max_ms': longest * 1e3, 'last_ms': last * 1e3})
+                for name, (count, total, longest, last) in self._timers.items())
+            counters = OrderedDict(self._counters)
+        values = OrderedDict()
+        for name, function in self._watches.items():
+            try:
+                values[name] = function()
+            except Exception as e:
+                values[name] = f"error: {e}"
+        return {'name': self.name, 'timers': timers, 'counters': counters, 'values': values}
+
+def format_snapshot(snapshot):
+    """Short text lines of a snapshot, for an on-screen overlay."""
+    lines = [snapshot['name']]
+    for name, timer in snapshot['timers'].items():
+        lines.append(f"  {name:<10}{timer['count']:>6}x {timer['mean_ms']:8.1f} ms"
+                     f"  last {timer['last_ms']:8.1f}  max {timer['max_ms']:8.1f}")
+    for name, value in list(snapshot['counters'].items()) + list(snapshot['values'].items()):
+        if isinstance(value, float):
+            value = f"{value:.2f}"
+        lines.append(f"  {name:<24}{value}")
+    return lines
+
+class StatsDumper:
+    """Appends snapshots of some Stats to a file every interval seconds.
+
+    A .csv path gets one row per value (time, component, kind, name,
+    field, value); any other path gets one JSON object per line.
+    """
+    def __init__(self, stats, path, interval=5.0):
+        self.stats = list(stats)
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the thread and write one last snapshot."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.dump()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.dump()
+
+    def dump(self):
+        now = time.time()
+        snapshots = [stats.snapshot() for stats in self.stats]
+        try:
+            if self.path.lower().endswith('.csv'):
+                self._write_csv(now, snapshots)
+            else:
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps({'time': now, 'stats': snapshots}) + '\n')
+        except OSError as e:
+            print(f"Error writing stats to {self.path}: {e}")
+
+    def _write_csv(self, now, snapshots):
+        new_file = not os.path.exists(self.path)
+        with open(self.path, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(['time', 'component', 'kind', 'name', 'field', 'value'])
+            for snapshot in snapshots:
+                for name, timer in snapshot['timers'].items():
+                    for field, value in timer.items():
+                        writer.writerow([now, snapshot['name'], 'timer', name, field, value])
+                for name, value in snapshot['counters'].items():
+                    writer.writerow([now, snapshot['name'], 'counter', name, '', value])
+                for name, value in snapshot['values'].items():
+                    writer.writerow([now, snapshot['name'], 'value', name, '', value])
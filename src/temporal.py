@@ -0,0 +1,115 @@
+import numpy as np
+
+import methods
+from incremental import IncrementalDitherer, dirty_tiles, tile_boxes
+
+class TemporalDitherer:
+    """Dithers video frames so areas that did not change keep their pattern.
+
+    A pixel takes a new dithered value only when its input moved more than
+    tolerance (0..1, largest channel difference) away from the input its
+    current output came from; otherwise the previous output is kept. Seeded
+    methods use the same seed every frame, so their noise stays in place.
+    Inputs may be float matrices in 0..1 or uint8 frames. Only the parts
+    of a frame that hold changed pixels are dithered again.
+    """
+    DEFAULT_TOLERANCE = 4.0 / 255.0
+    DEFAULT_SEED = 0
+
+    def __init__(self, threshold_value, dither_method, palette_method,
+                 tolerance=DEFAULT_TOLERANCE, seed=DEFAULT_SEED):
+        self.settings = (threshold_value, dither_method, palette_method)
+        self.tolerance = tolerance
+        self.seed = seed
+        self.changed_fraction = 1.0
+        self.reset()
+
+    def reset(self):
+        """Forget the previous frame, e.g. after a seek."""
+        self._reference = None
+        self._output = None
+
+    def changed(self, frame):
+        """Mask of pixels that need a new dither, None if all of them do."""
+        if self._reference is None or self._reference.shape != frame.shape:
+            return None
+        limit = self.tolerance * (255.0 if frame.dtype == np.uint8 else 1.0)
+        difference = np.abs(frame.astype(np.float32) - self._reference)
+        return difference.max(axis=2) > limit
+
+    def update(self, frame):
+        """Mask of pixels of frame that need a new dither, None if all of them do.
+
+        The reference moves to frame wherever the mask is set, so this is
+        called once for every frame, in order.
+        """
+        changed = self.changed(frame)
+        if changed is None:
+            self._reference = frame.astype(np.float32)
+        else:
+            # The reference only follows pixels that were re-dithered, so slow
+            # drift below the tolerance still triggers an update eventually
+            self._reference[changed] = frame[changed]
+        return changed
+
+    def regions(self, changed, shape):
+        """(y0, y1, x0, x1) boxes of a frame to dither again for a mask from update().
+
+        Dithering just the boxes gives every changed pixel the value a full
+        dither would: pointwise methods redo the changed tiles, methods that
+        work in row order the rows down to the last change, others the
+        whole frame.
+        """
+        rows, cols = shape[:2]
+        if changed is None:
+            return [(0, rows, 0, cols)]
+        changed_rows = np.flatnonzero(changed.any(axis=1))
+        if len(changed_rows) == 0:
+            return []
+        info = methods.method_info(self.settings[1])
+        if info.tiling:
+            dirty = dirty_tiles(changed, IncrementalDitherer.TILE_SIZE)
+            if dirty.mean() <= IncrementalDitherer.MAX_TILE_FRACTION:
+                return tile_boxes(dirty, IncrementalDitherer.TILE_SIZE, rows, cols)
+        if info.raster:
+            return [(0, int(changed_rows[-1]) + 1, 0, cols)]
+        return [(0, rows, 0, cols)]
+
+    def paste(self, shape, boxes, crops):
+        """Dither of a frame put together from the dithered crops of its boxes.
+
+        Outside the boxes the previous output stands in, which apply()
+        never reads: every changed pixel lies inside a box.
+        """
+        crops = iter(crops)
+        if boxes == [(0, shape[0], 0, shape[1])]:
+            return next(crops)
+        dithered = self._output.copy()
+        for (y0, y1, x0, x1), crop in zip(boxes, crops):
+            dithered[y0:y1, x0:x1] = crop
+        return dithered
+
+    def apply(self, dithered, changed):
+        """Output for a frame: dithered where the mask from update() is set."""
+        if changed is None:
+            self._output = dithered.copy()
+            self.changed_fraction = 1.0
+            return dithered
+
+        self._output[changed] = dithered[changed]
+        self.changed_fraction = float(changed.mean())
+        return self._output.copy()
+
+    def compose(self, frame, dithered):
+        """Output for frame given its full dither, keeping unchanged pixels."""
+        return self.apply(dithered, self.update(frame))
+
+    def dither(self, image_matrix):
+        """Dithered float matrix for the next frame, as methods return it."""
+        changed = self.update(image_matrix)
+        boxes = self.regions(changed, image_matrix.shape)
+        threshold_value, dither_method, palette_method = self.settings
+        crops = (methods.dither_matrix(image_matrix[y0:y1, x0:x1], threshold_value, dither_method,
+                                       palette_method, self.seed)
+                 for y0, y1, x0, x1 in boxes)
+        return self.apply(self.paste(image_matrix.shape, boxes, crops), changed)
@@ -21,10 +21,30 @@ def threshold(image_matrix, palette_name, threshold_val=0.5):
     white_black_image[~binary_mask] = [0.0, 0.0, 0.0]  # Black
 
     # Apply palette to image
-    new_matrix = utils.closest_palette_color(white_black_image, palette_name)
+    new_matrix = utils.quantize(white_black_image, palette_name)
 
     return new_matrix
 
+def threshold_indices_uint8(pixels, palette_name, threshold_val=0.5):
+    """Palette indices of uint8 RGB pixels, the same threshold() gives.
+
+    pixels may also be an (N, H, W, 3) stack of frames.
+    """
+    # Brightness of every level per channel, summed as the float path does
+    levels = utils.UINT8_LEVELS
+    brightness = ((0.299 * levels)[pixels[..., 0]] +
+                  (0.587 * levels)[pixels[..., 1]] +
+                  (0.114 * levels)[pixels[..., 2]])
+
+    # Only black and white get quantized, so two lookups cover the image
+    black, white = utils.palette_indices(np.array([[[0.0, 0.0, 0.0], [1.0, 1.0, 1.0]]], dtype=np.float32),
+                                         palette_name)[0]
+    return np.where(brightness > threshold_val, white, black)
+
 available_methods = OrderedDict([
     ('threshold', lambda im, pal, threshold_val=0.5: threshold(im, pal, threshold_val)),
 ])
+
+uint8_methods = OrderedDict([
+    ('threshold', threshold_indices_uint8),
+])
@@ -1,12 +1,157 @@
 import numpy as np
 from PIL import Image
-from PyQt6.QtGui import QImage, QPixmap
+import jobs
 import palette
+import palette_index
 import math
 
+# Range of every channel the default LUT covers
+UNIT_BOUNDS = (0.0, 1.0)
+
+# Upper bound for the temporaries of the tiled palette searches and of one
+# LUT lookup block, in bytes
+TILE_MEMORY_LIMIT = palette_index.DEFAULT_MAX_BYTES
+
+# Rough size of the LUT lookup temporaries per pixel
+_LOOKUP_BYTES_PER_PIXEL = 64
+
+def _lookup_block_length(max_bytes=None):
+    """Pixels per LUT lookup block so its temporaries stay under max_bytes."""
+    if max_bytes is None:
+        max_bytes = TILE_MEMORY_LIMIT
+    return max(1, int(max_bytes // _LOOKUP_BYTES_PER_PIXEL))
+
+class PaletteLUT:
+    """Quantized RGB -> palette index table for O(1) nearest color lookup.
+
+    The cube bounds**3, the unit RGB cube by default, is split into
+    (2**bits)**3 cells. Squared distance gaps between two palette colors
+    are affine in the pixel, so when all 8 corners of a cell have the same
+    strictly nearest color, every point of the cell does too. Other cells
+    are marked ambiguous.
+    """
+    # Squared distance gap below which a corner counts as a tie; also
+    # covers float32 rounding when a pixel is mapped to its cell
+    _TIE_EPSILON = 1e-5
+
+    def __init__(self, palette_array, bits=6, bounds=UNIT_BOUNDS):
+        self.bits = bits
+        self.cells = 1 << bits
+        self.low, self.high = bounds
+        self.scale = self.cells / (self.high - self.low)
+        index_dtype = np.uint8 if len(palette_array) <= 256 else np.uint16
+
+        corners = self.low + np.arange(self.cells + 1, dtype=np.float64) / self.scale
+        plane = np.stack(np.meshgrid(corners, corners, indexing='ij'), axis=-1).reshape(-1, 2)
+        colors = palette_array.astype(np.float64)
+
+        # Nearest color of every cell corner, -1 where it is not strict
+        corner_indices = np.empty((self.cells + 1, len(plane)), dtype=np.intp)
+        # One red slice at a time keeps the distance matrix small
+        for r in range(self.cells + 1):
+            dist = ((corners[r] - colors[np.newaxis, :, 0]) ** 2 +
+                    (plane[:, 0, np.newaxis] - colors[np.newaxis, :, 1]) ** 2 +
+                    (plane[:, 1, np.newaxis] - colors[np.newaxis, :, 2]) ** 2)
+            corner_indices[r] = np.argmin(dist, axis=1)
+            if len(colors) > 1:
+                nearest_two = np.partition(dist, 1, axis=1)[:, :2]
+                corner_indices[r][nearest_two[:, 1] - nearest_two[:, 0] <= self._TIE_EPSILON] = -1
+        corner_indices = corner_indices.reshape(self.cells + 1, self.cells + 1, self.cells + 1)
+
+        first = corner_indices[:-1, :-1, :-1]
+        self.ambiguous = first < 0
+        for dr in (0, 1):
+            for dg in (0, 1):
+                for db in (0, 1):
+                    corner = corner_indices[dr:dr + self.cells, dg:dg + self.cells, db:db + self.cells]
+                    self.ambiguous |= corner != first
+        self.indices = np.where(self.ambiguous, 0, first).astype(index_dtype)
+        self._flat = None
+
+    def lookup(self, pixels, palette_array, refine=True, index=None, max_bytes=None):
+        """Palette indices for an (N, 3) array of pixels.
+
+        With refine, pixels in ambiguous cells or outside the bounds are
+        searched exactly, so the result matches closest_palette_color.
+        Without it they are clipped and take the cell's index. Pixels go
+        through in blocks whose temporaries stay under max_bytes.
+        """
+        result = np.empty(len(pixels), dtype=self.indices.dtype)
+        step = _lookup_block_length(max_bytes)
+        for start in range(0, len(pixels), step):
+            jobs.check_cancelled()
+            block = pixels[start:start + step]
+            out = result[start:start + step]
+
+            cell = ((block - self.low) * self.scale).astype(np.intp)
+            np.clip(cell, 0, self.cells - 1, out=cell)
+            r, g, b = cell[:, 0], cell[:, 1], cell[:, 2]
+            out[:] = self.indices[r, g, b]
+
+            if refine:
+                exact = self.ambiguous[r, g, b]
+                exact |= np.any((block < self.low) | (block > self.high), axis=1)
+                if exact.any():
+                    out[exact] = _closest_indices(block[exact], palette_array, max_bytes, index)
+
+        return result
+
+    def _flat_tables(self):
+        # indices and ambiguous flattened with one extra cell per channel
+        # standing for values outside the bounds, which always need the exact search
+        if self._flat is None:
+            size = self.cells + 1
+            indices = np.zeros((size, size, size), dtype=self.indices.dtype)
+            indices[:-1, :-1, :-1] = self.indices
+            ambiguous = np.ones((size, size, size), dtype=bool)
+            ambiguous[:-1, :-1, :-1] = self.ambiguous
+            self._flat = (indices.reshape(-1), ambiguous.reshape(-1))
+        return self._flat
+
+    def lookup_table(self, values, pixels, offsets, palette_array, index=None, max_bytes=None):
+        """lookup() for pixels given as positions into a 1-D value table.
+
+        Channel c of a pixel is values[offsets + pixels[..., c]] for uint8
+        pixels of shape (..., H, W, 3) and integer offsets of shape (H, W).
+        The result equals lookup() of the gathered pixels with refine, but
+        the per-pixel work is integer gathers only, done in blocks of rows.
+        """
+        size = self.cells + 1
+        cell_table = np.clip(((values - self.low) * self.scale).astype(np.intp), 0, self.cells - 1)
+        cell_table[(values < self.low) | (values > self.high)] = self.cells
+        cell_table = cell_table.astype(np.int32)
+        # Flat cell contribution of every table entry, per channel
+        channel_tables = (cell_table * (size * size), cell_table * size, cell_table)
+        flat_indices, flat_ambiguous = self._flat_tables()
+
+        rows, cols = offsets.shape
+        lines = pixels.reshape(-1, cols, 3)
+        result = np.empty(lines.shape[:2], dtype=self.indices.dtype)
+        step = max(1, _lookup_block_length(max_bytes) // cols)
+        for start in range(0, len(lines), step):
+            jobs.check_cancelled()
+            block = lines[start:start + step]
+            out = result[start:start + step]
+
+            # Rows of stacked frames repeat the offsets of one frame
+            block_offsets = offsets[np.arange(start, start + len(block)) % rows]
+            channels = [block_offsets + block[..., channel] for channel in range(3)]
+            flat = channel_tables[0][channels[0]]
+            flat += channel_tables[1][channels[1]]
+            flat += channel_tables[2][channels[2]]
+            out[:] = flat_indices[flat]
+
+            exact = flat_ambiguous[flat]
+            if exact.any():
+                gathered = np.stack([values[channel[exact]] for channel in channels], axis=-1)
+                out[exact] = _closest_indices(gathered, palette_array, max_bytes, index)
+        return result.reshape(pixels.shape[:-1])
+
 class PaletteCache:
     def __init__(self):
         self._arrays = {}
+        self._luts = {}
+        self._indexes = {}
 
     def get_palette_array(self, palette_name):
         if palette_name not in self._arrays:
@@ -14,6 +159,26 @@ class PaletteCache:
             self._arrays[palette_name] = np.array(palette.palettes[palette_name], dtype=np.float32)
         return self._arrays[palette_name]
 
+    def get_lut(self, palette_name, bits=6, bounds=UNIT_BOUNDS):
+        palette_array = self.get_palette_array(palette_name)
+        if len(palette_array) > palette_index.INDEX_MIN_PALETTE_SIZE:
+            # Most cells would be ambiguous and the build takes seconds, so
+            # a single cell sends every pixel straight to the grid index
+            bits = 0
+        key = (palette_name, bits, bounds)
+        if key not in self._luts:
+            # Built on first use only
+            self._luts[key] = PaletteLUT(palette_array, bits, bounds)
+        return self._luts[key]
+
+    def get_palette_index(self, palette_name, bounds=UNIT_BOUNDS):
+        # None for palettes small enough for brute force
+        key = (palette_name, bounds)
+        if key not in self._indexes:
+            self._indexes[key] = palette_index.build_palette_index(
+                self.get_palette_array(palette_name), bounds)
+        return self._indexes[key]
+
 _palette_cache = PaletteCache()
 
 def open_image(image_filename):
@@ -26,13 +191,54 @@ def open_image(image_filename):
 def pil2numpy(image):
     return np.array(image, dtype=np.float32) / 255.0
 
+def uint8_to_float(pixels):
+    """The float matrix pil2numpy gives for the same uint8 pixels."""
+    return pixels.astype(np.float32) / 255.0
+
+# Float value of every uint8 level, exactly as pil2numpy computes it
+UINT8_LEVELS = np.arange(256, dtype=np.float32) / 255.0
+
 def numpy2pil(matrix):
     return Image.fromarray((matrix * 255).astype(np.uint8))
 
 def clamp(val):
     return max(0.0, min(1.0, val))
 
-def closest_palette_color(value, palette_name):
+def _closest_indices(pixels, palette_array, max_bytes=None, index=None):
+    """Exact nearest palette index for an (N, 3) array of pixels."""
+    if max_bytes is None:
+        max_bytes = TILE_MEMORY_LIMIT
+    return palette_index.closest_indices(pixels, palette_array, max_bytes, index)
+
+def palette_indices(image_matrix, palette_name, refine=True, bounds=UNIT_BOUNDS):
+    """Nearest palette index of every pixel of an (H, W, 3) image via the palette LUT.
+
+    bounds is the channel range the LUT covers; callers whose pixels leave
+    the unit cube pass the range they produce.
+    """
+    palette_array = _palette_cache.get_palette_array(palette_name)
+    lut = _palette_cache.get_lut(palette_name, bounds=bounds)
+    index = _palette_cache.get_palette_index(palette_name, bounds)
+    h, w, _ = image_matrix.shape
+    return lut.lookup(image_matrix.reshape(-1, 3), palette_array, refine, index).reshape(h, w)
+
+def table_palette_indices(values, pixels, offsets, palette_name, bounds=UNIT_BOUNDS):
+    """palette_indices of uint8 pixels whose channels, shifted by offsets, index values."""
+    palette_array = _palette_cache.get_palette_array(palette_name)
+    lut = _palette_cache.get_lut(palette_name, bounds=bounds)
+    index = _palette_cache.get_palette_index(palette_name, bounds)
+    return lut.lookup_table(values, pixels, offsets, palette_array, index)
+
+def palette_colors_uint8(palette_name):
+    """uint8 palette colors, the bytes numpy2pil writes for them."""
+    return (_palette_cache.get_palette_array(palette_name) * 255).astype(np.uint8)
+
+def quantize(image_matrix, palette_name, refine=True, bounds=UNIT_BOUNDS):
+    """Replace every pixel with its palette color using a single LUT gather."""
+    palette_array = _palette_cache.get_palette_array(palette_name)
+    return palette_array[palette_indices(image_matrix, palette_name, refine, bounds)]
+
+def closest_palette_color(value, palette_name, max_bytes=None):
     palette_array = _palette_cache.get_palette_array(palette_name)
 
     # If value - list [r, g, b], converting to numpy array
@@ -52,15 +258,18 @@ def closest_palette_color(value, palette_name):
         h, w, c = value.shape
         value_flat = value.reshape(-1, 3)
 
-        # Determ path to all palette colors for all pixels
-        distances = np.sqrt(np.sum((value_flat[:, np.newaxis, :] - palette_array[np.newaxis, :, :]) ** 2, axis=2))
+        index = _palette_cache.get_palette_index(palette_name)
+        if max_bytes is None:
+            max_bytes = TILE_MEMORY_LIMIT
+        itemsize = np.result_type(value_flat.dtype, palette_array.dtype).itemsize
+        tile = palette_index._tile_length(len(palette_array), itemsize, max_bytes)
 
-        # Finding indexes of close colors
-        min_indices = np.argmin(distances, axis=1)
-
-        # Change pixels with close colors from palette
-        result_flat = palette_array[min_indices]
-        return result_flat.reshape(h, w, c)
+        # Change pixels with close colors from palette, tile by tile
+        result = np.empty((h * w, c), dtype=palette_array.dtype)
+        for start in range(0, h * w, tile):
+            min_indices = _closest_indices(value_flat[start:start + tile], palette_array, max_bytes, index)
+            np.take(palette_array, min_indices, axis=0, out=result[start:start + tile])
+        return result.reshape(h, w, c)
 
     else:
         # Fallback to original logic
@@ -83,6 +292,9 @@ def closest_palette_color(value, palette_name):
             return colors[ci_use]
 
 def pil_to_pixmap(pil_image):
+    # Qt is imported here so headless users of utils never load it
+    from PyQt6.QtGui import QImage, QPixmap
+
     try:
         if pil_image.mode == '1':
             pil_image = pil_image.convert('L')
@@ -0,0 +1,139 @@
+import queue
+import threading
+
+class VideoReader:
+    """Keeps one capture open and reads frames as RGB arrays.
+
+    Reading the frame after the previous one continues decoding without a
+    seek; short forward gaps are skipped with grab(), anything else seeks.
+    """
+    # Decoding a few frames is cheaper than a seek back to the keyframe
+    MAX_GRAB_AHEAD = 16
+
+    def __init__(self, video_path):
+        # OpenCV loads with the first video, not with the program
+        import cv2
+
+        self.video_path = video_path
+        self._cap = cv2.VideoCapture(video_path)
+        self._position = 0
+        self._lock = threading.Lock()
+
+    def is_opened(self):
+        return self._cap is not None and self._cap.isOpened()
+
+    @property
+    def frame_count(self):
+        import cv2
+
+        return int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT)) if self.is_opened() else 0
+
+    @property
+    def fps(self):
+        import cv2
+
+        return self._cap.get(cv2.CAP_PROP_FPS) if self.is_opened() else 0.0
+
+    @property
+    def position(self):
+        """Index of the frame the next read() without an index returns."""
+        return self._position
+
+    def read(self, frame_index=None):
+        """Frame at frame_index (default: the next one), None past the end."""
+        import cv2
+
+        with self._lock:
+            if not self.is_opened():
+                return None
+            if frame_index is None:
+                frame_index = self._position
+
+            skip = frame_index - self._position
+            if 0 < skip <= self.MAX_GRAB_AHEAD:
+                for _ in range(skip):
+                    if not self._cap.grab():
+                        return None
+            elif skip != 0:
+                self._cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+            self._position = frame_index
+
+            ret, frame = self._cap.read()
+            if not ret:
+                return None
+            self._position += 1
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def close(self):
+        with self._lock:
+            if self._cap is not None:
+                self._cap.release()
+                self._cap = None
+
+class FrameStream:
+    """Decodes a video on a background thread into a bounded queue.
+
+    Iterating yields (frame_index, frame_rgb) in order. The decoder blocks
+    once max_queued frames wait, so a slow consumer bounds memory.
+    """
+    _END = None
+    _PUT_TIMEOUT = 0.1
+
+    def __init__(self, video_path, max_queued=8, start=0):
+        self.reader = VideoReader(video_path)
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._stop = threading.Event()
+        self._thread = None
+        self._start = start
+
+    def is_opened(self):
+        return self.reader.is_opened()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._decode, daemon=True)
+            self._thread.start()
+        return self
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=self._PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _decode(self):
+        try:
+            frame_index = self._start
+            frame = self.reader.read(frame_index)
+            while frame is not None and self._put((frame_index, frame)):
+                frame_index += 1
+                frame = self.reader.read()
+        except Exception as e:
+            print(f"Error decoding {self.reader.video_path}: {e}")
+        finally:
+            self._put(self._END)
+
+    def __iter__(self):
+        self.start()
+        while True:
+            item = self._queue.get()
+            if item is self._END:
+                return
+            yield item
+
+    def close(self):
+        """Stop the decoder and release the capture."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.reader.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()